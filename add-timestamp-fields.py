@@ -1,5 +1,11 @@
+import os
+import sys
+
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
+
 # Configuration
 DIRECTUS_URL = "http://localhost:8055"
 ADMIN_EMAIL = "admin@example.com"
@@ -12,17 +18,12 @@ def add_timestamp_fields():
     
     # Step 1: Login as admin
     print("\n1. Logging in as admin...")
-    login_response = requests.post(
-        f"{DIRECTUS_URL}/auth/login",
-        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
-    )
-    
-    if login_response.status_code != 200:
-        print(f"❌ Login failed: {login_response.status_code}")
+    client = DirectusClient(DIRECTUS_URL)
+    try:
+        client.login(ADMIN_EMAIL, ADMIN_PASSWORD)
+    except requests.HTTPError as e:
+        print(f"❌ Login failed: {e.response.status_code}")
         return
-    
-    admin_token = login_response.json()["data"]["access_token"]
-    headers = {"Authorization": f"Bearer {admin_token}"}
     print("✅ Logged in")
     
     # Step 2: Add date_created field
@@ -44,9 +45,8 @@ def add_timestamp_fields():
         }
     }
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/fields/patterns",
-        headers=headers,
+    response = client.post(
+        "/fields/patterns",
         json=date_created_field
     )
     
@@ -74,9 +74,8 @@ def add_timestamp_fields():
         }
     }
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/fields/patterns",
-        headers=headers,
+    response = client.post(
+        "/fields/patterns",
         json=date_updated_field
     )
     
@@ -3,22 +3,20 @@
 Konfiguriere Permissions über API (korrektes Format)
 """
 
-import requests
+import os
+import sys
 import json
 
-DIRECTUS_URL = "http://localhost:8055"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
-with open("/tmp/directus_token.txt", "r") as f:
-    TOKEN = f.read().strip()
+DIRECTUS_URL = "http://localhost:8055"
 
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 def get_policy_id_for_role(role_name):
     """Hole Policy ID für eine Rolle"""
-    response = requests.get(f"{DIRECTUS_URL}/policies", headers=HEADERS)
+    response = client.get("/policies")
     if response.status_code == 200:
         policies = response.json()["data"]
         for policy in policies:
@@ -29,7 +27,7 @@ def get_policy_id_for_role(role_name):
 
 def get_role_id(role_name):
     """Hole Role ID"""
-    response = requests.get(f"{DIRECTUS_URL}/roles", headers=HEADERS)
+    response = client.get("/roles")
     if response.status_code == 200:
         roles = response.json()["data"]
         for role in roles:
@@ -49,7 +47,7 @@ def create_permission(policy_id, collection, action, fields=None, permissions_fi
         "presets": None
     }
     
-    response = requests.post(f"{DIRECTUS_URL}/permissions", headers=HEADERS, json=data)
+    response = client.post("/permissions", json=data)
     
     if response.status_code in [200, 204]:
         print(f"  ✅ {collection}.{action}")
@@ -122,7 +120,7 @@ else:
     print(f"   Role ID: {friends_role_id}")
     
     # Erstelle oder finde Policy für diese Rolle
-    response = requests.get(f"{DIRECTUS_URL}/policies", headers=HEADERS)
+    response = client.get("/policies")
     policies = response.json()["data"] if response.status_code == 200 else []
     
     friends_policy_id = None
@@ -134,9 +132,8 @@ else:
     
     if not friends_policy_id:
         # Erstelle Policy für diese Rolle
-        response = requests.post(
-            f"{DIRECTUS_URL}/policies",
-            headers=HEADERS,
+        response = client.post(
+            "/policies",
             json={
                 "name": "Friends & Family Policy",
                 "icon": "group",
@@ -210,7 +207,7 @@ else:
     print(f"   Role ID: {worker_role_id}")
     
     # Finde oder erstelle Policy
-    response = requests.get(f"{DIRECTUS_URL}/policies", headers=HEADERS)
+    response = client.get("/policies")
     policies = response.json()["data"] if response.status_code == 200 else []
     
     worker_policy_id = None
@@ -220,9 +217,8 @@ else:
             break
     
     if not worker_policy_id:
-        response = requests.post(
-            f"{DIRECTUS_URL}/policies",
-            headers=HEADERS,
+        response = client.post(
+            "/policies",
             json={
                 "name": "Worker Policy",
                 "icon": "settings",
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
-import requests, json
+import os, sys, json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
 DIRECTUS_URL = "http://localhost:8055"
-with open("/tmp/directus_token.txt") as f:
-    TOKEN = f.read().strip()
-HEADERS = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 friends_role_id = "76d42f41-37af-4e76-aa92-a163ced9e02a"
 worker_role_id = "e7640f3b-012a-4c6c-ac5c-fd5933269daa"
@@ -12,7 +13,7 @@ worker_role_id = "e7640f3b-012a-4c6c-ac5c-fd5933269daa"
 print("📌 Erstelle Policies für Rollen\n")
 
 # Friends & Family Policy
-r = requests.post(f"{DIRECTUS_URL}/policies", headers=HEADERS, json={
+r = client.post("/policies", json={
     "name": "Friends & Family Policy",
     "icon": "group",
     "admin_access": False,
@@ -25,7 +26,7 @@ if r.status_code in [200, 204]:
     
     # Permissions
     def cp(coll, fields, filt):
-        requests.post(f"{DIRECTUS_URL}/permissions", headers=HEADERS, json={
+        client.post("/permissions", json={
             "policy": friends_policy_id, "collection": coll, "action": "read",
             "fields": fields, "permissions": filt, "validation": None, "presets": None
         })
@@ -41,7 +42,7 @@ else:
     print(f"❌ Friends: {r.status_code}")
 
 # Worker Policy
-r = requests.post(f"{DIRECTUS_URL}/policies", headers=HEADERS, json={
+r = client.post("/policies", json={
     "name": "Worker Policy",
     "icon": "settings",
     "admin_access": False,
@@ -53,7 +54,7 @@ if r.status_code in [200, 204]:
     print(f"\n✅ Worker Policy: {worker_policy_id}")
     
     def cp(coll):
-        requests.post(f"{DIRECTUS_URL}/permissions", headers=HEADERS, json={
+        client.post("/permissions", json={
             "policy": worker_policy_id, "collection": coll, "action": "read",
             "fields": ["*"], "permissions": {}, "validation": None, "presets": None
         })
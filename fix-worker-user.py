@@ -1,5 +1,11 @@
+import os
+import sys
+
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
+
 # Configuration
 DIRECTUS_URL = "http://localhost:8055"
 ADMIN_EMAIL = "admin@example.com"
@@ -13,24 +19,18 @@ def fix_worker_user():
     
     # Step 1: Login as admin
     print("\n1. Logging in as admin...")
-    login_response = requests.post(
-        f"{DIRECTUS_URL}/auth/login",
-        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
-    )
-    
-    if login_response.status_code != 200:
-        print(f"❌ Login failed: {login_response.status_code}")
+    client = DirectusClient(DIRECTUS_URL)
+    try:
+        client.login(ADMIN_EMAIL, ADMIN_PASSWORD)
+    except requests.HTTPError as e:
+        print(f"❌ Login failed: {e.response.status_code}")
         return
-    
-    admin_token = login_response.json()["data"]["access_token"]
     print("✅ Logged in successfully")
-    headers = {"Authorization": f"Bearer {admin_token}"}
     
     # Step 2: Get Worker role ID
     print("\n2. Finding Worker role...")
-    roles_response = requests.get(
-        f"{DIRECTUS_URL}/roles",
-        headers=headers,
+    roles_response = client.get(
+        "/roles",
         params={"filter[name][_eq]": "Worker"}
     )
     
@@ -48,9 +48,8 @@ def fix_worker_user():
     
     # Step 3: Update worker user
     print(f"\n3. Updating worker user {WORKER_USER_ID}...")
-    update_response = requests.patch(
-        f"{DIRECTUS_URL}/users/{WORKER_USER_ID}",
-        headers=headers,
+    update_response = client.patch(
+        f"/users/{WORKER_USER_ID}",
         json={
             "role": worker_role_id,
             "email": "worker@example.com",
@@ -121,7 +121,7 @@ function SearchResults() {
           <div className="space-y-6">
             {results.map((result) => (
               <Link
-                key={result.id}
+                key={result.pattern_id || result.id}
                 href={`/patterns/${result.slug}`}
                 className="block bg-white rounded-xl shadow-sm hover:shadow-lg transition p-6 border border-gray-100"
               >
@@ -163,6 +163,7 @@ function SearchResults() {
 
                 <div className="flex items-center gap-4 text-sm text-gray-500 pt-4 border-t border-gray-100">
                   <span>{new Date(result.date_created).toLocaleDateString()}</span>
+                  {result.page && <span>Page {result.page}</span>}
                   {result.pdf_file && (
                     <span className="flex items-center gap-1 text-pink-600 font-medium">
                       <svg
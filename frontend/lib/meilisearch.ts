@@ -13,8 +13,13 @@ export const meilisearchClient = new MeiliSearch({
 export const PATTERNS_INDEX = 'patterns_index';
 
 // Search result types
+// With chunked indexing (INDEX_CHUNKING in the worker) a hit is one chunk of
+// a pattern: id is "<pattern_id>_<n>" and page the PDF page it starts on.
+// The index's distinct attribute (pattern_id) keeps one hit per pattern.
 export type PatternSearchResult = {
   id: string;
+  pattern_id?: string;
+  page?: number | null;
   title: string;
   slug: string;
   visibility: string;
@@ -4,31 +4,24 @@ Directus Collections Setup Script
 Erstellt alle benötigten Collections und Fields über die API
 """
 
-import requests
-import json
+import os
 import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
 # Directus Config
 DIRECTUS_URL = "http://localhost:8055"
 
 # Token aus Datei lesen
-with open("/tmp/directus_token.txt", "r") as f:
-    TOKEN = f.read().strip()
-
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 def create_collection(name, schema):
     """Erstelle eine Collection"""
     print(f"\n📦 Erstelle Collection: {name}")
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/collections",
-        headers=HEADERS,
-        json=schema
-    )
+    response = client.post("/collections", json=schema)
     
     if response.status_code in [200, 204]:
         print(f"✅ Collection '{name}' erstellt")
@@ -44,11 +37,7 @@ def create_field(collection, field_name, field_schema):
     """Erstelle ein Field in einer Collection"""
     print(f"  ➕ Feld: {field_name}")
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/fields/{collection}",
-        headers=HEADERS,
-        json=field_schema
-    )
+    response = client.post(f"/fields/{collection}", json=field_schema)
     
     if response.status_code in [200, 204]:
         print(f"    ✅ Feld '{field_name}' erstellt")
@@ -1,5 +1,11 @@
+import os
+import sys
+
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
+
 # Configuration
 DIRECTUS_URL = "http://localhost:8055"
 ADMIN_EMAIL = "admin@example.com"
@@ -12,22 +18,17 @@ def setup_permissions():
     
     # Step 1: Login as admin
     print("\n1. Logging in as admin...")
-    login_response = requests.post(
-        f"{DIRECTUS_URL}/auth/login",
-        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
-    )
-    
-    if login_response.status_code != 200:
-        print(f"❌ Login failed: {login_response.status_code}")
+    client = DirectusClient(DIRECTUS_URL)
+    try:
+        client.login(ADMIN_EMAIL, ADMIN_PASSWORD)
+    except requests.HTTPError as e:
+        print(f"❌ Login failed: {e.response.status_code}")
         return
-    
-    admin_token = login_response.json()["data"]["access_token"]
-    headers = {"Authorization": f"Bearer {admin_token}"}
     print("✅ Logged in")
     
     # Step 2: Get Friends & Family role ID
     print("\n2. Getting Friends & Family role ID...")
-    roles_response = requests.get(f"{DIRECTUS_URL}/roles", headers=headers)
+    roles_response = client.get("/roles")
     roles = roles_response.json()["data"]
     
     friends_family_role = None
@@ -61,9 +62,8 @@ def setup_permissions():
         "fields": ["*"]
     }
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/permissions",
-        headers=headers,
+    response = client.post(
+        "/permissions",
         json=patterns_permission
     )
     
@@ -85,9 +85,8 @@ def setup_permissions():
         "fields": ["*"]
     }
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/permissions",
-        headers=headers,
+    response = client.post(
+        "/permissions",
         json=files_permission
     )
     
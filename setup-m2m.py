@@ -3,27 +3,19 @@
 Directus M2M Relations - korrigierte Version
 """
 
-import requests
+import os
+import sys
 
-DIRECTUS_URL = "http://localhost:8055"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
-with open("/tmp/directus_token.txt", "r") as f:
-    TOKEN = f.read().strip()
+DIRECTUS_URL = "http://localhost:8055"
 
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 def api_request(method, endpoint, data=None):
     """Helper für API Requests"""
-    url = f"{DIRECTUS_URL}{endpoint}"
-    if method == "POST":
-        response = requests.post(url, headers=HEADERS, json=data)
-    elif method == "GET":
-        response = requests.get(url, headers=HEADERS)
-    
-    return response
+    return client.request(method, endpoint, json=data)
 
 print("🚀 Erstelle M2M Relations korrekt...\n")
 
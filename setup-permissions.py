@@ -3,31 +3,21 @@
 Phase 2: Rollen & Rechte Konfiguration
 """
 
-import requests
+import os
+import sys
 import json
 import time
 
-DIRECTUS_URL = "http://localhost:8055"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
-with open("/tmp/directus_token.txt", "r") as f:
-    TOKEN = f.read().strip()
+DIRECTUS_URL = "http://localhost:8055"
 
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 def api_request(method, endpoint, data=None):
     """Helper für API Requests"""
-    url = f"{DIRECTUS_URL}{endpoint}"
-    if method == "POST":
-        response = requests.post(url, headers=HEADERS, json=data)
-    elif method == "GET":
-        response = requests.get(url, headers=HEADERS)
-    elif method == "PATCH":
-        response = requests.patch(url, headers=HEADERS, json=data)
-    
-    return response
+    return client.request(method, endpoint, json=data)
 
 def get_or_create_public_role():
     """Hole oder erstelle Public Role"""
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
-import requests
+import os
+import sys
 
-DIRECTUS_URL = "http://localhost:8055"
-with open("/tmp/directus_token.txt") as f:
-    TOKEN = f.read().strip()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
-HEADERS = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+DIRECTUS_URL = "http://localhost:8055"
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 PUBLIC_POLICY_ID = "abf8a154-5b1c-4a46-ac9c-7300570f4f17"
 
 def create_perm(policy, coll, action, fields, filt):
@@ -18,7 +19,7 @@ def create_perm(policy, coll, action, fields, filt):
         "validation": None,
         "presets": None
     }
-    r = requests.post(f"{DIRECTUS_URL}/permissions", headers=HEADERS, json=data)
+    r = client.post("/permissions", json=data)
     if r.status_code in [200, 204]:
         print(f"  ✅ {coll}.{action}")
     elif "unique" in r.text.lower() or "already" in r.text.lower():
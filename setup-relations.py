@@ -4,28 +4,22 @@ Directus Relations Setup
 Erstellt Junction Tables und Relations für M2M Beziehungen
 """
 
-import requests
+import os
+import sys
 import json
 
-DIRECTUS_URL = "http://localhost:8055"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
-with open("/tmp/directus_token.txt", "r") as f:
-    TOKEN = f.read().strip()
+DIRECTUS_URL = "http://localhost:8055"
 
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 def create_relation(relation_schema):
     """Erstelle eine Relation"""
     print(f"\n🔗 Erstelle Relation: {relation_schema.get('collection')} -> {relation_schema.get('field')}")
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/relations",
-        headers=HEADERS,
-        json=relation_schema
-    )
+    response = client.post("/relations", json=relation_schema)
     
     if response.status_code in [200, 204]:
         print(f"✅ Relation erstellt")
@@ -41,11 +35,7 @@ def create_field(collection, field_schema):
     """Erstelle ein Field"""
     print(f"  ➕ Feld: {field_schema['field']} in {collection}")
     
-    response = requests.post(
-        f"{DIRECTUS_URL}/fields/{collection}",
-        headers=HEADERS,
-        json=field_schema
-    )
+    response = client.post(f"/fields/{collection}", json=field_schema)
     
     if response.status_code in [200, 204]:
         print(f"    ✅ Erstellt")
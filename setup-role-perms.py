@@ -1,16 +1,17 @@
 #!/usr/bin/env python3
-import requests
+import os
+import sys
 
-DIRECTUS_URL = "http://localhost:8055"
-with open("/tmp/directus_token.txt") as f:
-    TOKEN = f.read().strip()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
-HEADERS = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+DIRECTUS_URL = "http://localhost:8055"
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 def get_policy_for_role(role_name):
     """Finde Policy ID für Role"""
     # Hole Roles
-    r = requests.get(f"{DIRECTUS_URL}/roles", headers=HEADERS)
+    r = client.get("/roles")
     roles = r.json()["data"]
     role_id = None
     for role in roles:
@@ -22,7 +23,7 @@ def get_policy_for_role(role_name):
         return None
     
     # Hole Policies
-    r = requests.get(f"{DIRECTUS_URL}/policies", headers=HEADERS)
+    r = client.get("/policies")
     policies = r.json()["data"]
     
     for policy in policies:
@@ -30,7 +31,7 @@ def get_policy_for_role(role_name):
             return policy["id"]
     
     # Erstelle neue Policy
-    r = requests.post(f"{DIRECTUS_URL}/policies", headers=HEADERS, json={
+    r = client.post("/policies", json={
         "name": f"{role_name} Policy",
         "icon": "group",
         "admin_access": False,
@@ -51,7 +52,7 @@ def create_perm(policy, coll, action, fields, filt):
         "validation": None,
         "presets": None
     }
-    r = requests.post(f"{DIRECTUS_URL}/permissions", headers=HEADERS, json=data)
+    r = client.post("/permissions", json=data)
     if r.status_code in [200, 204]:
         print(f"  ✅ {coll}.{action}")
     elif "unique" in r.text.lower():
@@ -3,23 +3,20 @@
 Erstelle Test-Daten in Directus
 """
 
-import requests
+import os
+import sys
 
-DIRECTUS_URL = "http://localhost:8055"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
 
-with open("/tmp/directus_token.txt", "r") as f:
-    TOKEN = f.read().strip()
+DIRECTUS_URL = "http://localhost:8055"
 
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json"
-}
+client = DirectusClient.from_token_file(DIRECTUS_URL)
 
 def create_item(collection, data):
     """Erstelle einen Eintrag"""
-    response = requests.post(
-        f"{DIRECTUS_URL}/items/{collection}",
-        headers=HEADERS,
+    response = client.post(
+        f"/items/{collection}",
         json=data
     )
     
@@ -1,6 +1,11 @@
-import requests
+import os
 import sys
 
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker"))
+from directus_client import DirectusClient
+
 # Configuration
 DIRECTUS_URL = "http://localhost:8055"
 ADMIN_EMAIL = "admin@example.com"
@@ -13,25 +18,19 @@ def create_worker_user_and_token():
     
     # Step 1: Login as admin
     print("\n1. Logging in as admin...")
-    login_response = requests.post(
-        f"{DIRECTUS_URL}/auth/login",
-        json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
-    )
-    
-    if login_response.status_code != 200:
-        print(f"❌ Login failed: {login_response.status_code}")
+    client = DirectusClient(DIRECTUS_URL)
+    try:
+        client.login(ADMIN_EMAIL, ADMIN_PASSWORD)
+    except requests.HTTPError as e:
+        print(f"❌ Login failed: {e.response.status_code}")
         return None
-    
-    admin_token = login_response.json()["data"]["access_token"]
     print("✅ Logged in successfully")
     
-    headers = {"Authorization": f"Bearer {admin_token}"}
     
     # Step 2: Find or get Worker role
     print("\n2. Finding Worker role...")
-    roles_response = requests.get(
-        f"{DIRECTUS_URL}/roles",
-        headers=headers,
+    roles_response = client.get(
+        "/roles",
         params={"filter[name][_eq]": "Worker"}
     )
     
@@ -49,9 +48,8 @@ def create_worker_user_and_token():
     
     # Step 3: Check if worker user already exists
     print("\n3. Checking for existing worker user...")
-    users_response = requests.get(
-        f"{DIRECTUS_URL}/users",
-        headers=headers,
+    users_response = client.get(
+        "/users",
         params={"filter[email][_eq]": "worker@example.com"}
     )
     
@@ -63,9 +61,8 @@ def create_worker_user_and_token():
         else:
             # Create worker user
             print("\n3b. Creating new worker user...")
-            create_user_response = requests.post(
-                f"{DIRECTUS_URL}/users",
-                headers=headers,
+            create_user_response = client.post(
+                "/users",
                 json={
                     "email": "worker@example.com",
                     "password": "WorkerPass123!",
@@ -86,9 +83,8 @@ def create_worker_user_and_token():
     
     # Step 4: Create static token
     print("\n4. Creating static token...")
-    token_response = requests.post(
-        f"{DIRECTUS_URL}/users/{worker_id}/tokens",
-        headers=headers,
+    token_response = client.post(
+        f"/users/{worker_id}/tokens",
         json={
             "name": "PDF Worker Token",
             "expires": None  # Never expires
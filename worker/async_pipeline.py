@@ -0,0 +1,394 @@
+"""
+Async PDF Processing Pipeline
+Event-loop variant of the pipeline for many concurrent downloads (WORKER_MODE=asyncio)
+"""
+
+import asyncio
+import functools
+import hashlib
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import aiohttp
+except ImportError:  # only needed for WORKER_MODE=asyncio
+    aiohttp = None
+
+from directus_client import RETRY_STATUS_CODES
+from download import CHUNK_SIZE, DownloadResult
+from extraction import extract_to_spool
+from indexer import BatchIndexer
+from metrics import DOWNLOAD_BYTES, DOWNLOAD_SECONDS, QUEUE_DEPTH
+from pipeline import _DONE, Pipeline
+from tracing import current_context, span
+
+
+def async_available():
+    return aiohttp is not None
+
+
+class AsyncDirectusClient:
+    """aiohttp counterpart of DirectusClient.get() for the download path
+
+    Takes base URL, token, timeout and the retry policy (429/502/503/504,
+    connection errors, Retry-After, full-jitter backoff) from a DirectusClient.
+    """
+
+    def __init__(self, session, client):
+        self.session = session
+        self.client = client
+        self.headers = {"Authorization": client.session.headers.get("Authorization", "")}
+
+    async def get(self, path, headers=None):
+        """GET with retries; the caller has to release the response"""
+        headers = {**self.headers, **(headers or {})}
+        for attempt in range(self.client.retries + 1):
+            last_attempt = attempt == self.client.retries
+            try:
+                response = await self.session.get(self.client.url(path), headers=headers)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self.client.delay(attempt))
+                continue
+
+            if response.status not in RETRY_STATUS_CODES or last_attempt:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            response.release()
+            await asyncio.sleep(self.client.delay(attempt, retry_after))
+
+    async def download(self, path, max_bytes, etag=None, suffix=".pdf"):
+        """Same contract as download.download_file()"""
+        response = await self.get(path, {"If-None-Match": etag} if etag else None)
+        async with response:
+            if response.status == 304:
+                return DownloadResult("not_modified", None, etag, None, 0)
+            response.raise_for_status()
+
+            content_length = response.content_length or 0
+            if content_length > max_bytes:
+                return DownloadResult("too_large", None, None, None, content_length)
+
+            digest = hashlib.sha256()
+            size = 0
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+            try:
+                with temp_file:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            Path(temp_file.name).unlink(missing_ok=True)
+                            return DownloadResult("too_large", None, None, None, size)
+                        digest.update(chunk)
+                        temp_file.write(chunk)
+            except BaseException:
+                Path(temp_file.name).unlink(missing_ok=True)
+                raise
+
+        return DownloadResult("ok", temp_file.name, response.headers.get("ETag"),
+                              digest.hexdigest(), size)
+
+
+class AsyncBatchIndexer(BatchIndexer):
+    """BatchIndexer that talks to Meilisearch through aiohttp
+
+    flush() only closes batches; submit() sends them and poll() follows
+    their tasks, so neither blocks the event loop. Batching, retries and
+    the callbacks are those of BatchIndexer.
+    """
+
+    def __init__(self, session, url, api_key, index_uid, **kwargs):
+        super().__init__(None, None, **kwargs)
+        self.session = session
+        self.url = url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.index_uid = index_uid
+        self.ready = []  # (entries, delete filter) waiting for submit()
+
+    def flush(self):
+        if self.cleanup_filters:
+            self.ready.append(([], self._cleanup_filter()))
+        if self.batch:
+            self.ready.append((self.batch, None))
+            self.batch = []
+            self.batch_bytes = 0
+
+    async def submit(self):
+        """Send all closed batches and cleanup filters"""
+        ready, self.ready = self.ready, []
+        for entries, delete_filter in ready:
+            try:
+                if delete_filter:
+                    task = await self._request("POST", f"/indexes/{self.index_uid}/documents/delete",
+                                               json={"filter": delete_filter})
+                else:
+                    task = await self._request("POST", f"/indexes/{self.index_uid}/documents",
+                                               json=[document for _, document, _, _ in entries])
+            except Exception as e:
+                if delete_filter:
+                    print(f"⚠️ Error deleting stale documents: {e}")
+                else:
+                    self._submit_failed(entries, e)
+                continue
+            self._submitted(task["taskUid"], entries)
+
+    async def poll(self):
+        if not self.pending:
+            return
+        try:
+            tasks = (await self._request("GET", "/tasks", params={
+                "uids": ",".join(map(str, self.pending)), "limit": str(len(self.pending))
+            }))["results"]
+        except Exception as e:
+            print(f"⚠️ Error polling Meilisearch tasks: {e}")
+            return
+        for task in tasks:
+            self._task_done(task["uid"], task["status"], task.get("error"))
+
+    async def drain(self, interval=0.1):
+        """Submit everything and wait for all tasks (at most task_timeout)"""
+        deadline = time.monotonic() + self.task_timeout
+        while self.pending or self.batch or self.cleanup_filters or self.ready:
+            self.flush()
+            await self.submit()
+            await self.poll()
+            if not self.pending:
+                continue
+            if time.monotonic() > deadline:
+                self._abandon_pending()
+                break
+            await asyncio.sleep(interval)
+
+    async def _request(self, method, path, **kwargs):
+        async with self.session.request(method, f"{self.url}{path}", headers=self.headers,
+                                        **kwargs) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+class AsyncPipeline(Pipeline):
+    """Pipeline on one event loop instead of a thread per transfer
+
+    - up to `downloads` PDFs are fetched at once with aiohttp
+    - extraction still runs in the worker's process pool and OCR and
+      cache writes in threads, the loop only awaits them
+    - the indexer submits and polls Meilisearch tasks with aiohttp
+
+    At most downloads + queue_size patterns are in progress, which bounds
+    the PDFs on disk like the queues of the threaded pipeline do. Stage
+    logic (cache lookups, OCR, failure and trace bookkeeping) is shared
+    with Pipeline.
+    """
+
+    def __init__(self, worker, downloads, extract_workers, queue_size, max_pdf_bytes,
+                 ocr_workers=0, ocr_budget=None):
+        super().__init__(worker, downloads, extract_workers, queue_size, ocr_workers, ocr_budget)
+        self.queue_size = queue_size
+        self.max_pdf_bytes = max_pdf_bytes
+        # QUEUE_DEPTH reports the patterns currently waiting in or running a stage
+        self.in_stage = Counter()
+        for name in ("download", "extract", "ocr", "index"):
+            QUEUE_DEPTH.set(functools.partial(self.in_stage.__getitem__, name), queue=name)
+
+    async def run(self, patterns):
+        """Process all patterns and return the ones that have to be retried
+
+        patterns may be a lazy iterator; it is advanced in a thread, so a
+        Directus page fetch does not stall the transfers in flight.
+        """
+        directus = self.worker.directus
+        timeout = aiohttp.ClientTimeout(sock_connect=directus.timeout, sock_read=directus.timeout)
+        connector = aiohttp.TCPConnector(limit=self.download_workers + 2)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            self.directus = AsyncDirectusClient(session, directus)
+            self.download_slots = asyncio.Semaphore(self.download_workers)
+            self.extract_slots = asyncio.Semaphore(self.extract_workers)
+            self.ocr_slots = asyncio.Semaphore(max(self.ocr_workers, 1))
+            self.index_items = asyncio.Queue(maxsize=self.queue_size)
+            admitted = asyncio.Semaphore(self.download_workers + self.queue_size)
+            indexer = asyncio.create_task(self._index_loop(session))
+            tasks = set()
+
+            try:
+                patterns = iter(patterns)
+                while (pattern := await asyncio.to_thread(next, patterns, None)) is not None:
+                    if not pattern.get("pdf_file"):
+                        continue
+                    await admitted.acquire()
+                    self._admit(pattern)
+                    task = asyncio.create_task(self._process(pattern))
+                    task.add_done_callback(lambda task: admitted.release())
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            finally:
+                if tasks:
+                    await asyncio.wait(tasks)
+                await self.index_items.put(_DONE)
+                await indexer
+                self._fail_unfinished()
+
+        return self.failed
+
+    async def _process(self, pattern):
+        """Download, extract and (if needed) OCR one pattern, then queue it for indexing"""
+        try:
+            with self._stage("download", pattern):
+                result = await self._download(pattern)
+            if isinstance(result, DownloadResult):
+                with self._stage("extract", pattern):
+                    result = await self._extract(pattern, result)
+            if result is not None:
+                with self._stage("index", pattern):
+                    await self.index_items.put(result)
+        except Exception as e:
+            print(f"❌ processing failed for pattern {pattern['id']}: {e}")
+            self._fail(pattern, error=e)
+
+    @contextmanager
+    def _stage(self, name, pattern):
+        """Stage span as in Pipeline, counted in QUEUE_DEPTH while it is open"""
+        self.in_stage[name] += 1
+        try:
+            with span(name, self._trace(pattern), pattern_id=str(pattern["id"])) as trace:
+                yield trace
+        finally:
+            self.in_stage[name] -= 1
+
+    async def _download(self, pattern):
+        """Serve from the cache (returns pages to index) or fetch the PDF (returns the download)"""
+        print(f"\n📖 Processing: {pattern['title']}")
+        cache = self.worker.cache
+        file_id = pattern["pdf_file"]
+
+        # Metadata-only edit: same file version, no download needed
+        sha256 = cache.lookup_file(file_id, pattern.get("pdf_version"))
+        if sha256 is not None:
+            print("  Using cached text")
+            return pattern, cache.iter_pages(sha256)
+
+        sha256, etag = cache.last_download(file_id)
+        download = await self._download_pdf(pattern, etag)
+        if download is not None and download.status == "not_modified":
+            if cache.has(sha256):
+                print("  PDF unchanged (304), using cached text")
+                cache.link(file_id, pattern.get("pdf_version"), sha256, download.etag)
+                return pattern, cache.iter_pages(sha256)
+            # Text was evicted in the meantime
+            download = await self._download_pdf(pattern)
+
+        if download is None:
+            self._fail(pattern, error="download failed", attempt=False)
+            return None
+        if download.status == "too_large":
+            return pattern, iter(())
+
+        if cache.has(download.sha256):
+            print("  Using cached text for identical PDF")
+            Path(download.path).unlink(missing_ok=True)
+            cache.link(file_id, pattern.get("pdf_version"), download.sha256, download.etag)
+            return pattern, cache.iter_pages(download.sha256)
+
+        return download
+
+    async def _download_pdf(self, pattern, etag=None):
+        """PDFWorker.download_pdf() over aiohttp, at most `downloads` at a time"""
+        file_id = pattern["pdf_file"]
+        with span("download_pdf", pattern_id=str(pattern["id"]), file_id=file_id) as trace:
+            async with self.download_slots:
+                start = time.monotonic()
+                try:
+                    download = await self.directus.download(f"/assets/{file_id}",
+                                                            self.max_pdf_bytes, etag)
+                except Exception as e:
+                    DOWNLOAD_SECONDS.observe(time.monotonic() - start, status="error")
+                    print(f"❌ Error downloading PDF {file_id}: {e}")
+                    trace.fail("download failed")
+                    return None
+            DOWNLOAD_SECONDS.observe(time.monotonic() - start, status=download.status)
+            if download.status == "ok":
+                DOWNLOAD_BYTES.inc(download.size)
+            if download.status == "too_large":
+                print(f"⚠️ PDF {file_id} exceeds {self.max_pdf_bytes // 1024 // 1024} MB, skipping")
+            trace.set(status=download.status, file_size=download.size)
+        return download
+
+    async def _extract(self, pattern, download):
+        """Extraction in the process pool, then OCR or caching in a thread
+
+        Returns (pattern, pages) for the indexer or None if the pattern was
+        deferred by the OCR budget or its extraction process died before
+        spooling any text.
+        """
+        spool_path = f"{download.path}.txt"
+        pool = None  # stays None if even the restarted pool refuses the job
+        try:
+            # One job per process, the others wait here instead of in the pool's queue
+            async with self.extract_slots:
+                pool, future = self.worker.submit_extraction(
+                    extract_to_spool, download.path, spool_path, **self.worker.extract_options,
+                    trace_parent=current_context()
+                )
+                result = await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            return await asyncio.to_thread(self._extraction_crashed, pattern, download, spool_path,
+                                           pool, e)
+        except Exception:
+            self._discard(download.path, spool_path)
+            raise
+
+        self.worker.extraction_finished(pool, result)
+        self._extraction_done(pattern, result)
+        if result.ocr_pages and self.ocr_workers:
+            print(f"  {len(result.ocr_pages)} image-only pages queued for OCR")
+            with self._stage("ocr", pattern):
+                async with self.ocr_slots:
+                    return await asyncio.to_thread(self._ocr, pattern, download, spool_path, result)
+
+        Path(download.path).unlink(missing_ok=True)
+        return await asyncio.to_thread(self._store_text, pattern, download, spool_path, result)
+
+    async def _index_loop(self, session):
+        """Indexer: batch documents, submit and follow their tasks without blocking the loop"""
+        indexer = self.worker.create_indexer(
+            on_indexed=self._indexed,
+            on_failed=lambda pattern, error, attempt: self._fail(pattern, error=error,
+                                                                 attempt=attempt),
+            session=session
+        )
+        # As in Pipeline._index_loop, errors are reported and the loop goes on
+        while True:
+            try:
+                # Submit a partial batch once no new document arrived for a moment
+                item = await asyncio.wait_for(self.index_items.get(), 0.5)
+            except asyncio.TimeoutError:
+                try:
+                    indexer.flush()
+                    await indexer.submit()
+                    await indexer.poll()
+                except Exception as e:
+                    print(f"⚠️ Indexer error: {e}")
+                continue
+
+            if item is _DONE:
+                try:
+                    await indexer.drain()
+                except Exception as e:
+                    print(f"❌ Indexer error while draining: {e}")
+                return
+
+            try:
+                # Reading the spool or cache, normalizing and chunking are blocking
+                # work: build the documents in a thread. The loop only touches the
+                # indexer again once it is done, and the callbacks this may fire
+                # (_indexed, _fail) are thread-safe as in Pipeline.
+                await asyncio.to_thread(self._index_item, indexer, *item)
+                await indexer.submit()
+            except Exception as e:
+                print(f"❌ index failed for pattern {item[0]['id']}: {e}")
+                self._fail(item[0], error=e, attempt=False)
+
@@ -0,0 +1,7 @@
+"""
+Worker Benchmark
+Synthetic PDF corpus, local Directus/Meilisearch stand-ins and an end-to-end runner
+
+Usage (from worker/):
+    python -m benchmark.run --patterns 200 --pages 1-40 --image-ratio 0.1
+"""
@@ -0,0 +1,112 @@
+"""
+Synthetic PDF Corpus
+Reproducible PDFs with text and image-only pages and a log-normal size distribution
+"""
+
+import math
+import random
+from collections import namedtuple
+
+# pages: (min, max) page count per PDF; image_ratio: share of image-only pages;
+# size_kb: median file size, size_sigma: spread of the log-normal size distribution
+CorpusSpec = namedtuple("CorpusSpec", "count pages image_ratio words_per_page size_kb size_sigma seed")
+
+DEFAULT_SPEC = CorpusSpec(count=100, pages=(1, 20), image_ratio=0.0, words_per_page=300,
+                          size_kb=200, size_sigma=1.0, seed=1)
+
+_VOCABULARY = (
+    "Maschen Nadel Runde Reihe Muster Wolle Garn rechts links abketten anschlagen "
+    "Zunahme Abnahme Umschlag Rapport Bündchen Ärmel Kragen Rücken Vorderteil "
+    "stitch needle round row pattern yarn knit purl cast on bind off increase "
+    "decrease yarn over repeat ribbing sleeve collar back front gauge"
+).split()
+
+
+def make_pdf(pages, padding=0, rng=None):
+    """Build a PDF from page specs: ("text", text) or ("image",) for an image-only page
+
+    padding adds an unreferenced stream of incompressible bytes, to reach a
+    target file size without changing what the extractors see.
+    """
+    rng = rng or random.Random(0)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for page in pages:
+        page_id = len(objects) + 1
+        kids.append(f"{page_id} 0 R")
+        if page[0] == "image":
+            image_id = page_id + 2
+            content = b"q 612 0 0 792 0 0 cm /Im1 Do Q"
+            resources = f"/XObject << /Im1 {image_id} 0 R >>"
+        else:
+            lines = _wrap(page[1])
+            content = ("BT /F1 11 Tf 50 760 Td 13 TL "
+                       + " ".join(f"({line}) Tj T*" for line in lines) + " ET").encode("latin-1")
+            resources = "/Font << /F1 3 0 R >>"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << {resources} >> /Contents {page_id + 1} 0 R >>".encode())
+        objects.append(_stream(content))
+        if page[0] == "image":
+            pixels = rng.randbytes(64 * 64)
+            objects.append(_stream(pixels, "/Type /XObject /Subtype /Image /Width 64 /Height 64 "
+                                           "/ColorSpace /DeviceGray /BitsPerComponent 8"))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    if padding > 0:
+        objects.append(_stream(rng.randbytes(padding)))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n").encode()
+    return bytes(out)
+
+
+def _stream(data, dictionary=""):
+    return f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream"
+
+
+def _wrap(text, width=90):
+    """Split text into lines of at most width characters (one Tj each)"""
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    # The font uses WinAnsiEncoding, so umlauts survive the latin-1 encoding
+    return [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+
+
+def generate_corpus(spec=DEFAULT_SPEC):
+    """Yield (file id, PDF bytes, page count, image page count) for spec.count PDFs
+
+    The same spec always gives the same corpus.
+    """
+    rng = random.Random(spec.seed)
+    for n in range(spec.count):
+        page_count = rng.randint(*spec.pages)
+        pages = []
+        for _ in range(page_count):
+            if rng.random() < spec.image_ratio:
+                pages.append(("image",))
+            else:
+                words = " ".join(rng.choice(_VOCABULARY) for _ in range(spec.words_per_page))
+                pages.append(("text", words))
+        pdf = make_pdf(pages, rng=rng)
+
+        # Median size_kb; files larger than their target stay as they are
+        target = int(spec.size_kb * 1024 * math.exp(rng.gauss(0, spec.size_sigma)))
+        if target > len(pdf):
+            pdf = make_pdf(pages, padding=target - len(pdf), rng=rng)
+        image_pages = sum(1 for page in pages if page[0] == "image")
+        yield f"bench-{n:05d}", pdf, page_count, image_pages
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark Runner
+Runs one PDFWorker cycle on a synthetic corpus against local stand-ins
+
+Usage (from worker/):
+    python -m benchmark.run [--patterns 100] [--pages 1-20] [--image-ratio 0.1] [--size-kb 200]
+                            [--latency-ms 5] [--task-ms 10] [--env EXTRACT_WORKERS=2] [--json]
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark.corpus import DEFAULT_SPEC, CorpusSpec, generate_corpus
+from benchmark.standins import DirectusStandIn, MeilisearchStandIn
+
+
+def run_worker(env, verbose):
+    """One full processing cycle in a fresh process, so the worker's peak RSS is its own"""
+    if not verbose:
+        # fd level, so the extraction processes started from here are quiet too
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+    os.environ.update(env)
+    import worker  # reads its configuration from the environment on import
+
+    pdf_worker = worker.PDFWorker()
+    engines = pdf_worker.available_engines()
+    start = time.monotonic()
+    failed = pdf_worker.process_patterns(pdf_worker.get_patterns_to_process())
+    seconds = time.monotonic() - start
+    # Before shutdown: the extraction processes are children of the forkserver,
+    # so RUSAGE_CHILDREN would never see them
+    child_rss = max((peak_rss_mb(pid) for pid in descendants(os.getpid())), default=0.0)
+    pdf_worker.extract_pool.shutdown()
+
+    return {
+        "seconds": seconds,
+        "failed": len(failed),
+        "engines": engines,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on Linux
+        "peak_child_rss_mb": child_rss,
+    }
+
+
+def descendants(pid):
+    """Pids of all live descendants of pid (Linux /proc)"""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    # the command name may contain spaces, the fields after ")" do not
+                    parents[int(entry)] = int(stat.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    found, frontier = [], [pid]
+    while frontier:
+        parent = frontier.pop()
+        children = [child for child, ppid in parents.items() if ppid == parent]
+        found.extend(children)
+        frontier.extend(children)
+    return found
+
+
+def peak_rss_mb(pid):
+    """Peak resident set size (VmHWM) of a live process in MB, 0 if it is gone"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def build_fixtures(spec):
+    """Directus patterns and files for the corpus; returns (patterns, files, pages)"""
+    patterns, files = [], {}
+    pages = 0
+    for n, (file_id, pdf, page_count, _) in enumerate(generate_corpus(spec)):
+        files[file_id] = pdf
+        pages += page_count
+        patterns.append({
+            "id": f"pattern-{n:05d}",
+            "title": f"Benchmark pattern {n}",
+            "slug": f"benchmark-{n}",
+            "visibility": "private",
+            "notes": "",
+            "pdf_file": file_id,
+            "date_created": f"2024-01-01T{n // 3600 % 24:02d}:{n // 60 % 60:02d}:{n % 60:02d}",
+            "date_updated": None,
+        })
+    return patterns, files, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end PDFWorker benchmark")
+    parser.add_argument("--patterns", type=int, default=DEFAULT_SPEC.count)
+    parser.add_argument("--pages", default="%d-%d" % DEFAULT_SPEC.pages,
+                        help="page count range per PDF, e.g. 1-40")
+    parser.add_argument("--image-ratio", type=float, default=DEFAULT_SPEC.image_ratio,
+                        help="share of image-only pages (0-1)")
+    parser.add_argument("--words", type=int, default=DEFAULT_SPEC.words_per_page,
+                        help="words per text page")
+    parser.add_argument("--size-kb", type=int, default=DEFAULT_SPEC.size_kb,
+                        help="median PDF size (padded up to a log-normal target)")
+    parser.add_argument("--size-sigma", type=float, default=DEFAULT_SPEC.size_sigma)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SPEC.seed)
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="added to every Directus request")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0,
+                        help="asset download bandwidth, 0 = unlimited")
+    parser.add_argument("--task-ms", type=float, default=10, help="Meilisearch time per task")
+    parser.add_argument("--document-ms", type=float, default=0,
+                        help="Meilisearch time per document")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="worker setting, e.g. EXTRACT_WORKERS=2 (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the worker's output")
+    args = parser.parse_args()
+
+    low, _, high = args.pages.partition("-")
+    spec = CorpusSpec(args.patterns, (int(low), int(high or low)), args.image_ratio, args.words,
+                      args.size_kb, args.size_sigma, args.seed)
+    patterns, files, pages = build_fixtures(spec)
+
+    directus = DirectusStandIn(patterns, files, latency=args.latency_ms / 1000,
+                               bandwidth=args.bandwidth_mbps * 125000).start()
+    meilisearch = MeilisearchStandIn(task_seconds=args.task_ms / 1000,
+                                     document_seconds=args.document_ms / 1000).start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="pdfworker-bench-") as state_dir:
+            env = {
+                "DIRECTUS_URL": directus.url,
+                "DIRECTUS_TOKEN": "benchmark",
+                "MEILISEARCH_URL": meilisearch.url,
+                "MEILISEARCH_KEY": "benchmark",
+                "STATE_DIR": state_dir,
+                "ORPHAN_CHECK_INTERVAL": "0",
+            }
+            for setting in args.env:
+                name, _, value = setting.partition("=")
+                env[name] = value
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                result = pool.submit(run_worker, env, args.verbose).result()
+    finally:
+        directus.stop()
+        meilisearch.stop()
+
+    latencies = [
+        meilisearch.indexed_at[pattern["id"]] - directus.asset_requests[pattern["pdf_file"]]
+        for pattern in patterns
+        if pattern["id"] in meilisearch.indexed_at and pattern["pdf_file"] in directus.asset_requests
+    ]
+    report = {
+        "patterns": len(patterns),
+        "indexed": len(latencies),
+        "failed": result["failed"],
+        "pages": pages,
+        "corpus_mb": sum(len(pdf) for pdf in files.values()) / 1024 / 1024,
+        "engines": result["engines"],
+        "seconds": result["seconds"],
+        "patterns_per_sec": len(patterns) / result["seconds"] if result["seconds"] else 0.0,
+        "pages_per_sec": pages / result["seconds"] if result["seconds"] else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 0.95) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "peak_rss_mb": result["peak_rss_mb"],
+        "peak_child_rss_mb": result["peak_child_rss_mb"],
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"📚 {report['patterns']} patterns, {report['pages']} pages, "
+          f"{report['corpus_mb']:.1f} MB ({' -> '.join(report['engines'])})")
+    print(f"⏱️ {report['seconds']:.2f}s: {report['patterns_per_sec']:.1f} patterns/s, "
+          f"{report['pages_per_sec']:.1f} pages/s")
+    if latencies:
+        print(f"📈 time to indexed: p50 {report['p50_ms']:.0f} ms, p95 {report['p95_ms']:.0f} ms, "
+              f"p99 {report['p99_ms']:.0f} ms")
+    print(f"🧠 peak RSS: worker {report['peak_rss_mb']:.1f} MB, "
+          f"largest child {report['peak_child_rss_mb']:.1f} MB")
+    if report["failed"] or report["indexed"] < report["patterns"]:
+        print(f"⚠️ {report['indexed']}/{report['patterns']} indexed, {report['failed']} failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Service Stand-ins
+Minimal in-process Directus and Meilisearch HTTP servers for benchmark runs
+
+They implement just the routes the worker uses, with configurable
+latency, so a run measures the worker and not the real services.
+"""
+
+import json
+import operator
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes requests to methods of the stand-in that owns the server"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body=None, content_type="application/json", headers=None):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def json_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _dispatch(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.service.handle(self, self.command, url.path, query)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+
+class StandIn:
+    """An HTTP server on 127.0.0.1 in a daemon thread"""
+
+    def __init__(self, port=0):
+        handler = type("Handler", (_Handler,), {"service": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name=type(self).__name__,
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request, method, path, query):
+        raise NotImplementedError
+
+
+class DirectusStandIn(StandIn):
+    """/items/patterns (filter, sort=id, limit, pdf_file.* fields) and /assets/<id> with ETags
+
+    latency is added to every request, bandwidth (bytes/s, 0 = unlimited)
+    throttles asset bodies.
+    """
+
+    def __init__(self, patterns, files, latency=0.0, bandwidth=0, port=0):
+        super().__init__(port)
+        self.patterns = sorted(patterns, key=lambda pattern: pattern["id"])
+        self.files = files  # file id -> PDF bytes
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.asset_requests = {}  # file id -> time of the first request
+
+    def handle(self, request, method, path, query):
+        time.sleep(self.latency)
+        if method == "GET" and path == "/items/patterns":
+            return request.reply(200, {"data": self._list(query)})
+        match = re.fullmatch(r"/assets/([^/]+)", path)
+        if method == "GET" and match:
+            return self._asset(request, match.group(1))
+        request.reply(404, {"errors": [{"message": "Route not found"}]})
+
+    def _list(self, query):
+        filters = json.loads(query.get("filter", "{}"))
+        limit = int(query.get("limit", 100))
+        fields = query.get("fields", "")
+        items = [pattern for pattern in self.patterns if _directus_match(pattern, filters)]
+        if limit >= 0:
+            items = items[:limit]
+        if "pdf_file." not in fields:
+            return items
+        expanded = []
+        for pattern in items:
+            file_id = pattern.get("pdf_file")
+            item = dict(pattern)
+            if file_id:
+                item["pdf_file"] = {"id": file_id, "filesize": len(self.files[file_id]),
+                                    "modified_on": None, "uploaded_on": pattern["date_created"]}
+            expanded.append(item)
+        return expanded
+
+    def _asset(self, request, file_id):
+        data = self.files.get(file_id)
+        if data is None:
+            return request.reply(404, {"errors": [{"message": "File not found"}]})
+        with self.lock:
+            self.asset_requests.setdefault(file_id, time.monotonic())
+        etag = f'"{file_id}-{len(data)}"'
+        if request.headers.get("If-None-Match") == etag:
+            return request.reply(304, b"", headers={"ETag": etag})
+
+        request.send_response(200)
+        request.send_header("Content-Type", "application/pdf")
+        request.send_header("Content-Length", str(len(data)))
+        request.send_header("ETag", etag)
+        request.end_headers()
+        chunk_size = 256 * 1024
+        for start in range(0, len(data), chunk_size):
+            request.wfile.write(data[start:start + chunk_size])
+            if self.bandwidth:
+                time.sleep(chunk_size / self.bandwidth)
+
+
+def _directus_match(item, filters):
+    """Evaluate the Directus filter operators the worker uses (_and, _or, _nnull, _gt, _gte, _in, _eq)"""
+    for key, condition in filters.items():
+        if key == "_and":
+            if not all(_directus_match(item, part) for part in condition):
+                return False
+        elif key == "_or":
+            if not any(_directus_match(item, part) for part in condition):
+                return False
+        else:
+            value = item.get(key)
+            for name, argument in condition.items():
+                if name == "_nnull" and (value is None) == bool(argument):
+                    return False
+                if name == "_gt" and (value is None or not value > argument):
+                    return False
+                if name == "_gte" and (value is None or not value >= argument):
+                    return False
+                if name == "_in" and value not in argument:
+                    return False
+                if name == "_eq" and value != argument:
+                    return False
+    return True
+
+
+class MeilisearchStandIn(StandIn):
+    """Indexes, settings, documents and tasks of one Meilisearch instance
+
+    Tasks are processed one after another like in Meilisearch: each takes
+    task_seconds plus document_seconds per document, counted from when
+    the previous one finished. Status is derived from the clock, so no
+    background thread is needed.
+    """
+
+    def __init__(self, task_seconds=0.01, document_seconds=0.0, port=0):
+        super().__init__(port)
+        self.task_seconds = task_seconds
+        self.document_seconds = document_seconds
+        self.indexes = {}  # uid -> {"primaryKey", "documents", "settings"}
+        self.tasks = []
+        self.queue_free_at = 0.0
+        self.indexed_at = {}  # pattern_id -> time its latest document task finished
+
+    def handle(self, request, method, path, query):
+        with self.lock:
+            status, body = self._route(request, method, path, query)
+        request.reply(status, body)
+
+    def _route(self, request, method, path, query):
+        parts = path.strip("/").split("/")
+        if parts == ["indexes"] and method == "POST":
+            body = request.json_body()
+            index = {"primaryKey": body.get("primaryKey"), "documents": {}, "settings": {}}
+            return 202, self._enqueue(body["uid"], "indexCreation", 0,
+                                      lambda: self.indexes.setdefault(body["uid"], index))
+        if parts == ["tasks"]:
+            uids = {int(uid) for uid in query.get("uids", "").split(",") if uid}
+            results = [self._task_view(task) for task in self.tasks if not uids or task["uid"] in uids]
+            return 200, {"results": results, "limit": len(results), "from": None, "next": None,
+                         "total": len(results)}
+        if len(parts) == 2 and parts[0] == "tasks":
+            return 200, self._task_view(self.tasks[int(parts[1])])
+        if len(parts) < 2 or parts[0] != "indexes":
+            return 404, _error("not found", "invalid_request")
+
+        uid = parts[1]
+        index = self.indexes.get(uid)
+        if index is None:
+            return 404, _error(f"Index `{uid}` not found.", "index_not_found")
+        rest = parts[2:]
+        if not rest and method == "GET":
+            now = _timestamp(time.time())
+            return 200, {"uid": uid, "primaryKey": index["primaryKey"], "createdAt": now,
+                         "updatedAt": now}
+        if rest == ["settings"] and method == "GET":
+            return 200, {"searchableAttributes": ["*"], "filterableAttributes": [],
+                         "sortableAttributes": [], "displayedAttributes": ["*"],
+                         "distinctAttribute": None, **index["settings"]}
+        if rest == ["settings"] and method == "PATCH":
+            settings = request.json_body()
+            return 202, self._enqueue(uid, "settingsUpdate", 0,
+                                      lambda: index["settings"].update(settings))
+        if rest == ["documents"] and method == "POST":
+            return 202, self._add_documents(uid, index, request.json_body())
+        if rest == ["documents"] and method == "GET":
+            offset, limit = int(query.get("offset", 0)), int(query.get("limit", 20))
+            fields = query.get("fields", "*").split(",")
+            documents = list(index["documents"].values())[offset:offset + limit]
+            if fields != ["*"]:
+                documents = [{k: d[k] for k in fields if k in d} for d in documents]
+            return 200, {"results": documents, "offset": offset, "limit": limit,
+                         "total": len(index["documents"])}
+        if rest == ["documents", "delete-batch"] and method == "POST":
+            ids = [str(document_id) for document_id in request.json_body()]
+            return 202, self._enqueue(uid, "documentDeletion", len(ids), lambda: [
+                index["documents"].pop(document_id, None) for document_id in ids])
+        if rest == ["documents", "delete"] and method == "POST":
+            match = _parse_filter(request.json_body()["filter"])
+            return 202, self._enqueue(uid, "documentDeletion", 0, lambda: [
+                index["documents"].pop(key) for key, document in list(index["documents"].items())
+                if match(document)])
+        return 404, _error("not found", "invalid_request")
+
+    def _add_documents(self, uid, index, documents):
+        def apply():
+            for document in documents:
+                index["documents"][str(document[index["primaryKey"]])] = document
+
+        task = self._enqueue(uid, "documentAdditionOrUpdate", len(documents), apply)
+        finished = self.tasks[task["taskUid"]]["finished"]
+        for document in documents:
+            pattern_id = str(document.get("pattern_id", document.get("id")))
+            self.indexed_at[pattern_id] = max(self.indexed_at.get(pattern_id, 0), finished)
+        return task
+
+    def _enqueue(self, index_uid, kind, documents, apply):
+        """Schedule a task after the previous one; apply() runs right away (reads follow tasks anyway)"""
+        now = time.monotonic()
+        started = max(now, self.queue_free_at)
+        finished = started + self.task_seconds + documents * self.document_seconds
+        self.queue_free_at = finished
+        apply()
+        task = {"uid": len(self.tasks), "indexUid": index_uid, "type": kind,
+                "enqueued": time.time(), "started": started, "finished": finished}
+        self.tasks.append(task)
+        return {"taskUid": task["uid"], "indexUid": index_uid, "status": "enqueued", "type": kind,
+                "enqueuedAt": _timestamp(task["enqueued"])}
+
+    @staticmethod
+    def _task_view(task):
+        now = time.monotonic()
+        if now >= task["finished"]:
+            status = "succeeded"
+        elif now >= task["started"]:
+            status = "processing"
+        else:
+            status = "enqueued"
+        return {"uid": task["uid"], "indexUid": task["indexUid"], "status": status,
+                "type": task["type"], "details": {}, "error": None, "canceledBy": None,
+                "duration": None, "enqueuedAt": _timestamp(task["enqueued"]),
+                "startedAt": None, "finishedAt": None}
+
+
+def _timestamp(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _error(message, code):
+    return {"message": message, "code": code, "type": "invalid_request", "link": ""}
+
+
+_TOKEN = re.compile(r'\s*(\(|\)|\[|\]|,|!=|>=|<=|=|>|<|"(?:[^"\\]|\\.)*"|[\w.-]+)')
+
+
+def _parse_filter(expression):
+    """Compile the Meilisearch filter subset the worker sends into a predicate
+
+    Supports =, !=, >, >=, <, <=, IN [...], AND, OR and parentheses.
+    """
+    tokens = _TOKEN.findall(expression)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def value():
+        token = take()
+        if token.startswith('"'):
+            return json.loads(token)
+        try:
+            return float(token)
+        except ValueError:
+            return token
+
+    def comparison():
+        if peek() == "(":
+            take()
+            predicate = disjunction()
+            take()  # ")"
+            return predicate
+        field, comparison = take(), take()
+        if comparison == "IN":
+            take()  # "["
+            values = []
+            while peek() != "]":
+                values.append(value())
+                if peek() == ",":
+                    take()
+            take()
+            return lambda document: _compare(document.get(field), "IN", values)
+        argument = value()
+        return lambda document: _compare(document.get(field), comparison, argument)
+
+    def conjunction():
+        parts = [comparison()]
+        while peek() == "AND":
+            take()
+            parts.append(comparison())
+        return lambda document: all(part(document) for part in parts)
+
+    def disjunction():
+        parts = [conjunction()]
+        while peek() == "OR":
+            take()
+            parts.append(conjunction())
+        return lambda document: any(part(document) for part in parts)
+
+    return disjunction()
+
+
+_ORDERING = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+def _compare(actual, comparison, expected):
+    if comparison == "IN":
+        return any(_compare(actual, "=", value) for value in expected)
+    if isinstance(expected, float):
+        try:
+            actual = float(actual)
+        except (TypeError, ValueError):
+            return comparison == "!="
+    elif actual is not None:
+        actual = str(actual)
+    if comparison == "=":
+        return actual == expected
+    if comparison == "!=":
+        return actual != expected
+    if actual is None:
+        return False
+    return _ORDERING[comparison](actual, expected)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Extractor Benchmark
+Compares the registered extraction engines on a local folder of PDFs
+
+Usage:
+    python benchmark_extractors.py /path/to/pdfs [--engines pdftotext,pypdf2,pdfium] [--timeout 30]
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from extractors import EXTRACTORS
+
+
+def run_engine(name, pdf_paths, timeout):
+    """Extract all files with one engine (runs in a fresh process for a clean RSS)"""
+    extractor = EXTRACTORS[name]
+    pages = 0
+    output_bytes = 0
+    failures = 0
+    start = time.monotonic()
+    for pdf_path in pdf_paths:
+        try:
+            for text in extractor.iter_pages(pdf_path, timeout=timeout):
+                pages += 1
+                output_bytes += len(text.encode("utf-8"))
+        except Exception as e:
+            print(f"⚠️ {name} failed on {pdf_path}: {e}")
+            failures += 1
+    seconds = time.monotonic() - start
+
+    # ru_maxrss is in KiB on Linux; subprocess engines count via RUSAGE_CHILDREN
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        "engine": name,
+        "files": len(pdf_paths),
+        "failures": failures,
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_sec": pages / seconds if seconds else 0.0,
+        "peak_rss_mb": peak_rss / 1024,
+        "output_kb": output_bytes / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction engines")
+    parser.add_argument("folder", help="folder with PDF files (searched recursively)")
+    parser.add_argument("--engines", default=",".join(EXTRACTORS),
+                        help="comma-separated engines (default: all registered)")
+    parser.add_argument("--timeout", type=int, default=30, help="seconds per file")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(str(path) for path in Path(args.folder).rglob("*.pdf"))
+    if not pdf_paths:
+        print(f"❌ No PDF files found in {args.folder}")
+        sys.exit(1)
+
+    engines = [name.strip() for name in args.engines.split(",") if name.strip()]
+    unknown = [name for name in engines if name not in EXTRACTORS]
+    if unknown:
+        print(f"❌ Unknown engines: {', '.join(unknown)} (available: {', '.join(EXTRACTORS)})")
+        sys.exit(1)
+
+    print(f"📚 {len(pdf_paths)} PDFs in {args.folder}\n")
+    print(f"{'engine':<10} {'files':>6} {'failed':>6} {'pages':>7} {'seconds':>8} "
+          f"{'pages/s':>8} {'peak RSS MB':>12} {'output KB':>10}")
+    for name in engines:
+        if not EXTRACTORS[name].available():
+            print(f"{name:<10} not installed")
+            continue
+        # One fresh process per engine, so peak RSS is not inherited from the previous one
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            r = pool.submit(run_engine, name, pdf_paths, args.timeout).result()
+        print(f"{r['engine']:<10} {r['files']:>6} {r['failures']:>6} {r['pages']:>7} "
+              f"{r['seconds']:>8.2f} {r['pages_per_sec']:>8.1f} {r['peak_rss_mb']:>12.1f} "
+              f"{r['output_kb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
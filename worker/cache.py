@@ -0,0 +1,221 @@
+"""
+Extraction Cache
+Stores extracted PDF text on disk so unchanged files are never parsed twice
+"""
+
+import codecs
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from chunking import split_pages
+
+
+class ExtractionCache:
+    """SQLite store of zlib-compressed text, keyed by content hash, with LRU eviction
+
+    A second table maps Directus file id + file version (modified_on/filesize)
+    to the content hash, so a metadata-only edit of a pattern can be served
+    without downloading the PDF at all. It also keeps the ETag of the last
+    download for conditional requests. OCR results are kept per page, so an
+    OCR run spread over several cycles resumes where it stopped; they have
+    their own LRU bound (max_ocr_bytes), so cheap text never evicts them.
+    """
+
+    def __init__(self, db_path, max_bytes, max_ocr_bytes):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_ocr_bytes = max_ocr_bytes
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS texts ("
+                " sha256 TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS texts_last_used ON texts (last_used)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " file_id TEXT PRIMARY KEY,"
+                " version TEXT,"
+                " sha256 TEXT NOT NULL,"
+                " etag TEXT)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_pages ("
+                " sha256 TEXT NOT NULL,"
+                " page INTEGER NOT NULL,"
+                " languages TEXT NOT NULL,"
+                " data BLOB NOT NULL,"
+                " cpu_seconds REAL,"
+                " size INTEGER,"
+                " last_used REAL,"
+                " PRIMARY KEY (sha256, page, languages))"
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]
+            if "etag" not in columns:
+                self.conn.execute("ALTER TABLE files ADD COLUMN etag TEXT")
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(ocr_pages)")]
+            if "size" not in columns:
+                self.conn.execute("ALTER TABLE ocr_pages ADD COLUMN size INTEGER")
+                self.conn.execute("ALTER TABLE ocr_pages ADD COLUMN last_used REAL")
+                self.conn.execute("UPDATE ocr_pages SET size = length(data), last_used = 0")
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS ocr_pages_last_used ON ocr_pages (last_used)"
+            )
+
+    def lookup_file(self, file_id, version):
+        """Return the content hash of a Directus file if its version is unchanged and cached"""
+        if not version:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT f.sha256 FROM files f JOIN texts t ON t.sha256 = f.sha256"
+                " WHERE f.file_id = ? AND f.version = ?",
+                (file_id, version)
+            ).fetchone()
+        return row[0] if row else None
+
+    def last_download(self, file_id):
+        """Return (content hash, ETag) of the last download of a file whose text is cached
+
+        Regardless of the version; (None, None) if there is none.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT f.sha256, f.etag FROM files f JOIN texts t ON t.sha256 = f.sha256"
+                " WHERE f.file_id = ?",
+                (file_id,)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def has(self, sha256):
+        """True if text for a content hash is cached"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM texts WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+        return row is not None
+
+    def iter_pages(self, sha256):
+        """Yield (page number, text) of cached text and mark it as recently used
+
+        The compressed blob is read at once, but decompressed page by page.
+        Raises KeyError if the text was evicted in the meantime.
+        """
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT data FROM texts WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"text {sha256} is no longer cached")
+            self.conn.execute(
+                "UPDATE texts SET last_used = ? WHERE sha256 = ?",
+                (time.time(), sha256)
+            )
+        yield from split_pages(_decompress(row[0]))
+
+    def link(self, file_id, version, sha256, etag=None):
+        """Link a Directus file version to already cached text"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (file_id, version, sha256, etag) VALUES (?, ?, ?, ?)",
+                (file_id, version, sha256, etag)
+            )
+
+    def put(self, file_id, version, sha256, pages, etag=None):
+        """Store extracted pages ((page number, text) pairs) and link the Directus file to them
+
+        Pages are compressed as they arrive; only the compressed text is
+        held in memory.
+        """
+        compressor = zlib.compressobj(6)
+        parts = []
+        for page_number, text in pages:
+            if page_number > 1:
+                text = "\f" + text
+            parts.append(compressor.compress(text.encode("utf-8")))
+        parts.append(compressor.flush())
+        data = b"".join(parts)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO texts (sha256, data, size, last_used) VALUES (?, ?, ?, ?)",
+                (sha256, data, len(data), time.time())
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (file_id, version, sha256, etag) VALUES (?, ?, ?, ?)",
+                (file_id, version, sha256, etag)
+            )
+            self._evict()
+
+    def get_ocr_page(self, sha256, page, languages):
+        """Return the OCR text of one page of a PDF and mark it as recently used, or None"""
+        key = (sha256, page, languages)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT data FROM ocr_pages WHERE sha256 = ? AND page = ? AND languages = ?", key
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE ocr_pages SET last_used = ?"
+                    " WHERE sha256 = ? AND page = ? AND languages = ?",
+                    (time.time(), *key)
+                )
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def put_ocr_page(self, sha256, page, languages, text, cpu_seconds):
+        """Store the OCR text of one page (LRU-bounded by max_ocr_bytes)"""
+        data = zlib.compress(text.encode("utf-8"), 6)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_pages"
+                " (sha256, page, languages, data, cpu_seconds, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (sha256, page, languages, data, cpu_seconds, len(data), time.time())
+            )
+            self._evict_ocr()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits into max_bytes"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM texts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT sha256, size FROM texts ORDER BY last_used")
+        evicted = []
+        for sha256, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((sha256,))
+            total -= size
+        self.conn.executemany("DELETE FROM texts WHERE sha256 = ?", evicted)
+        self.conn.executemany("DELETE FROM files WHERE sha256 = ?", evicted)
+
+    def _evict_ocr(self):
+        """Drop least recently used OCR pages until they fit into max_ocr_bytes"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_pages").fetchone()[0]
+        if total <= self.max_ocr_bytes:
+            return
+        rows = self.conn.execute("SELECT rowid, size FROM ocr_pages ORDER BY last_used")
+        evicted = []
+        for rowid, size in rows:
+            if total <= self.max_ocr_bytes:
+                break
+            evicted.append((rowid,))
+            total -= size
+        self.conn.executemany("DELETE FROM ocr_pages WHERE rowid = ?", evicted)
+
+
+def _decompress(data, chunk_size=64 * 1024):
+    """Yield decompressed text chunk by chunk"""
+    decompressor = zlib.decompressobj()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for start in range(0, len(data), chunk_size):
+        yield decoder.decode(decompressor.decompress(data[start:start + chunk_size]))
+    yield decoder.decode(decompressor.flush(), final=True)
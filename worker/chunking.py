@@ -0,0 +1,55 @@
+"""
+Document Chunking
+Streams extracted PDF pages and splits them into per-page or word-window chunks
+"""
+
+import re
+
+CHUNKING_MODES = ("off", "page", "window")
+
+_WORDS = re.compile(r"\S+")
+
+
+def split_pages(chunks):
+    """Yield (page number, page text) from a stream of text chunks
+
+    Extractors, the spool files and the cache separate pages with form
+    feeds (\\f). Only the current page is held in memory.
+    """
+    page_number = 1
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *pages, buffer = buffer.split("\f")
+        for page in pages:
+            yield page_number, page
+            page_number += 1
+    yield page_number, buffer
+
+
+def iter_chunks(pages, mode, window_words=300):
+    """Yield (page number, chunk text) from (page number, page text) pairs
+
+    mode "page" gives one chunk per non-empty page, mode "window" chunks
+    of window_words words that may span pages (page is where the chunk
+    starts).
+    """
+    if mode == "page":
+        for page_number, page in pages:
+            page = page.strip()
+            if page:
+                yield page_number, page
+        return
+
+    words = []
+    start_page = None
+    for page_number, page in pages:
+        for word in _WORDS.findall(page):
+            if start_page is None:
+                start_page = page_number
+            words.append(word)
+            if len(words) >= window_words:
+                yield start_page, " ".join(words)
+                words, start_page = [], None
+    if words:
+        yield start_page, " ".join(words)
@@ -0,0 +1,107 @@
+"""
+Directus HTTP Client
+Shared requests.Session with connection pooling, timeouts and retry/backoff
+
+Used by the worker and by the setup scripts in the repository root
+(they add worker/ to sys.path).
+"""
+
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+class DirectusClient:
+    """Pooled Directus client with exponential backoff for idempotent calls
+
+    Connection errors, timeouts and 429/502/503/504 responses are retried
+    for GET/HEAD/PUT/DELETE/OPTIONS with full-jitter exponential backoff
+    (a Retry-After header is honoured). Non-idempotent calls such as POST
+    are sent once unless retry=True is passed explicitly.
+    """
+
+    def __init__(self, base_url, token=None, timeout=30, retries=4, backoff=0.5,
+                 max_backoff=30, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+        if token:
+            self.set_token(token)
+
+    @classmethod
+    def from_token_file(cls, base_url, path="/tmp/directus_token.txt", **kwargs):
+        """Client authenticated with the admin token written by the setup flow"""
+        with open(path, "r") as f:
+            return cls(base_url, f.read().strip(), **kwargs)
+
+    def set_token(self, token):
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def login(self, email, password):
+        """Log in with email/password and use the access token for all further requests"""
+        response = self.post("/auth/login", json={"email": email, "password": password})
+        response.raise_for_status()
+        token = response.json()["data"]["access_token"]
+        self.set_token(token)
+        return token
+
+    def url(self, path):
+        return path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"
+
+    def request(self, method, path, retry=None, **kwargs):
+        """Send a request; returns the response (status codes are not raised)"""
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        attempts = self.retries + 1 if retry else 1
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = self.session.request(method, self.url(path), **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                self._sleep(attempt)
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                return response
+            retry_after = response.headers.get("Retry-After")
+            response.close()
+            self._sleep(attempt, retry_after)
+
+    def _sleep(self, attempt, retry_after=None):
+        time.sleep(self.delay(attempt, retry_after))
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before the next attempt (a Retry-After header wins)"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
@@ -0,0 +1,52 @@
+"""
+Streaming Download
+Writes responses to disk chunk by chunk with a size guard and ETag support
+"""
+
+import hashlib
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+
+# status: "ok", "not_modified" or "too_large"
+DownloadResult = namedtuple("DownloadResult", "status path etag sha256 size")
+
+
+def download_file(client, path, max_bytes, etag=None, suffix=".pdf"):
+    """Stream a Directus path into a temporary file
+
+    Sends If-None-Match when an ETag from an earlier download is known, so an
+    unchanged file comes back as 304 without a body. The body is hashed while
+    it is written and aborted as soon as it exceeds max_bytes.
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+
+    with client.get(path, headers=headers, stream=True) as response:
+        if response.status_code == 304:
+            return DownloadResult("not_modified", None, etag, None, 0)
+        response.raise_for_status()
+
+        content_length = int(response.headers.get("Content-Length") or 0)
+        if content_length > max_bytes:
+            return DownloadResult("too_large", None, None, None, content_length)
+
+        digest = hashlib.sha256()
+        size = 0
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        try:
+            with temp_file:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        Path(temp_file.name).unlink(missing_ok=True)
+                        return DownloadResult("too_large", None, None, None, size)
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+        except BaseException:
+            Path(temp_file.name).unlink(missing_ok=True)
+            raise
+
+    return DownloadResult("ok", temp_file.name, response.headers.get("ETag"),
+                          digest.hexdigest(), size)
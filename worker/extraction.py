@@ -0,0 +1,315 @@
+"""
+PDF Text Extraction
+Module-level functions so they can run in a process pool (engines: extractors.py)
+"""
+
+import contextvars
+import os
+import re
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+from chunking import split_pages
+from extractors import EXTRACTORS
+from sandbox import NO_LIMITS, LimitExceeded, current_rss, init_process, scaled_timeout, time_budget
+from tracing import configure as configure_tracing, current_span, span, start_span
+
+DEFAULT_ENGINES = ("pdftotext", "pypdf2")
+MIN_TEXT_CHARS = 50  # less than this counts as a failed extraction
+
+# route: "text" (run the engine chain), "no_text" (image-only, nothing to
+# extract), "encrypted" (cannot be opened) or "unknown" (probe failed, run
+# the engine chain anyway)
+ProbeResult = namedtuple(
+    "ProbeResult", "route encrypted page_count probed_pages text_pages image_pages seconds"
+)
+# characters: sum over all pages, without surrounding whitespace
+# ocr_pages: empty, image-only page numbers to hand to the OCR lane
+# partial: None, or why extraction stopped early ("timeout", "memory", "output",
+# or "killed" for a process that died, set by the caller); the pages spooled
+# until then are kept
+# pid, rss: the extraction process and its resident memory afterwards (bytes)
+ExtractionResult = namedtuple(
+    "ExtractionResult", "characters pages engine probe seconds ocr_pages partial pid rss"
+)
+
+_TEXT_OPERATORS = re.compile(rb"\bT[jJ]\b")
+
+
+def init_extract_process(trace_file=None, otlp_endpoint=None, memory_mb=0):
+    """Process pool initializer: tracing plus the sandbox limits (see sandbox.py)"""
+    configure_tracing(trace_file, otlp_endpoint)
+    init_process(memory_mb)
+
+
+def _inspect_page(page):
+    """Return (draws text, shows an image) for a page from its resources"""
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else {}
+    xobjects = resources.get("/XObject")
+    xobjects = xobjects.get_object() if xobjects is not None else {}
+    subtypes = {xobject.get_object().get("/Subtype") for xobject in xobjects.values()}
+
+    if "/Form" in subtypes:
+        has_text = True  # text may be nested in the form, assume it is there
+    else:
+        contents = page.get_contents()
+        has_text = ("/Font" in resources and contents is not None
+                    and _TEXT_OPERATORS.search(contents.get_data()) is not None)
+    return has_text, "/Image" in subtypes
+
+
+def probe_pdf(pdf_path, max_pages=3):
+    """Inspect metadata and the first pages' resources to choose an engine
+
+    Only the document structure and a few content streams are read, no
+    text is extracted; max_pages bounds the cost of the probe. A PDF is
+    treated as a scan ("no_text") if none of the probed pages draws text but
+    at least one shows an image: the engine chain, and its fallback through
+    every engine, is skipped and its pages go to OCR.
+    """
+    start = time.monotonic()
+    try:
+        reader = PdfReader(pdf_path)
+        encrypted = reader.is_encrypted
+        if encrypted and not reader.decrypt(""):
+            return ProbeResult("encrypted", True, None, 0, 0, 0, time.monotonic() - start)
+
+        page_count = len(reader.pages)
+        pages = [_inspect_page(page) for page in reader.pages[:max_pages]]
+        text_pages = sum(1 for has_text, _ in pages if has_text)
+        image_pages = sum(1 for _, has_image in pages if has_image)
+        route = "no_text" if pages and not text_pages and image_pages else "text"
+        return ProbeResult(route, encrypted, page_count, len(pages), text_pages, image_pages,
+                           time.monotonic() - start)
+    except Exception as e:
+        print(f"⚠️ PDF probe failed: {e}")
+        return ProbeResult("unknown", None, None, 0, 0, 0, time.monotonic() - start)
+
+
+def iter_range_pages(extractors, pdf_path, first_page=1, last_page=None, timeout=30,
+                     used=None):
+    """Yield (page number, text) for a page range from the engine chain
+
+    Pages are held back until an engine has produced MIN_TEXT_CHARS
+    characters; from then on they stream straight through. If that engine
+    fails later, the next engine continues with the following page. If no
+    engine reaches the threshold, the best (small) partial result is used.
+    Names of the engines that contributed pages are added to used.
+    A used-up time budget (LimitExceeded) is not an engine failure and
+    ends the whole extraction.
+    """
+    page_number = first_page
+    best = (None, [])
+    for extractor in extractors:
+        held = []
+        held_chars = 0
+        start_page = page_number
+        trace = start_span("extract_engine", current_span(), engine=extractor.name,
+                           first_page=start_page, last_page=last_page or 0)
+        try:
+            for text in extractor.iter_pages(pdf_path, page_number, last_page, timeout):
+                if held is None:
+                    yield page_number, text
+                    page_number += 1
+                    continue
+                held.append(text)
+                held_chars += len(text.strip())
+                if held_chars >= MIN_TEXT_CHARS:
+                    if used is not None:
+                        used.add(extractor.name)
+                    for held_text in held:
+                        yield page_number, held_text
+                        page_number += 1
+                    held = None
+        except LimitExceeded as e:
+            trace.fail(e)
+            raise
+        except Exception as e:
+            trace.fail(e)
+            print(f"⚠️ {extractor.name} extraction failed: {e}")
+            continue
+        finally:
+            trace.set(pages=page_number - start_page, held_pages=len(held or ()))
+            trace.end()
+        if held is None:
+            return
+        if best[0] is None or held_chars > sum(len(text.strip()) for text in best[1]):
+            best = (extractor.name, held)
+
+    if best[0] is not None and used is not None:
+        used.add(best[0])
+    for text in best[1]:
+        yield page_number, text
+        page_number += 1
+
+
+def iter_page_ranges(extractors, pdf_path, page_count, range_pages, jobs, timeout=30, used=None):
+    """Yield (page number, text) of a large PDF extracted as parallel page ranges
+
+    Each range has its own timeout and its own fallback along the engine
+    chain, so one bad range does not cost a re-parse of the whole file.
+    At most jobs ranges are extracted ahead of the page being yielded.
+    """
+    def extract(first_page):
+        last_page = min(first_page + range_pages - 1, page_count)
+        pages = dict(iter_range_pages(extractors, pdf_path, first_page, last_page, timeout, used))
+        # One entry per page so page numbers stay aligned
+        return [(n, pages.get(n, "")) for n in range(first_page, last_page + 1)]
+
+    starts = iter(range(1, page_count + 1, range_pages))
+    executor = ThreadPoolExecutor(max_workers=jobs)
+
+    def submit(start):
+        # Carry the current span over, so engine spans of each range nest under it
+        return executor.submit(contextvars.copy_context().run, extract, start)
+
+    try:
+        running = deque(submit(start) for start in islice(starts, jobs))
+        while running:
+            pages = running.popleft().result()
+            running.extend(submit(start) for start in islice(starts, 1))
+            yield from pages
+    finally:
+        # If extraction stops early, do not wait for the ranges still running,
+        # they end with their own timeout
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_pages(pdf_path, engines=DEFAULT_ENGINES, page_count=None, range_pages=0,
+                   range_jobs=1, timeout=30, used=None, limits=NO_LIMITS):
+    """Yield (page number, text) for every page of a PDF from the engine chain
+
+    PDFs with more than range_pages pages (0 = never) are split into page
+    ranges that run range_jobs at a time, if the first engine supports it.
+    timeout is the base timeout of an engine run; limits adds to it per
+    page of the run and per MB of the file.
+    """
+    extractors = [EXTRACTORS[name] for name in engines if EXTRACTORS[name].available()]
+    if not extractors:
+        return
+
+    if range_pages and extractors[0].parallel_ranges and page_count is None:
+        try:
+            page_count = extractors[0].page_count(pdf_path)
+        except Exception as e:
+            print(f"⚠️ Page count failed: {e}")
+
+    size = Path(pdf_path).stat().st_size
+    if range_pages and extractors[0].parallel_ranges and page_count and page_count > range_pages:
+        yield from iter_page_ranges(extractors, pdf_path, page_count, range_pages, range_jobs,
+                                    scaled_timeout(timeout, limits, range_pages, size), used)
+    else:
+        yield from iter_range_pages(extractors, pdf_path,
+                                    timeout=scaled_timeout(timeout, limits, page_count, size),
+                                    used=used)
+
+
+def find_image_pages(pdf_path, page_numbers):
+    """Return the pages among page_numbers that show an image but draw no text (OCR candidates)"""
+    try:
+        reader = PdfReader(pdf_path)
+        if reader.is_encrypted and not reader.decrypt(""):
+            return []
+        image_pages = []
+        for page_number in page_numbers:
+            has_text, has_image = _inspect_page(reader.pages[page_number - 1])
+            if has_image and not has_text:
+                image_pages.append(page_number)
+        return image_pages
+    except Exception as e:
+        print(f"⚠️ Image page detection failed: {e}")
+        return []
+
+
+def extract_to_spool(pdf_path, spool_path, engines=DEFAULT_ENGINES, range_pages=0,
+                     range_jobs=1, timeout=30, probe_pages=3, ocr=False, limits=NO_LIMITS,
+                     trace_parent=None):
+    """Extract a PDF page by page into spool_path (pages separated by form feeds)
+
+    Runs in the process pool: only the spool file crosses the process
+    boundary, so neither process holds the whole text. probe_pdf() decides
+    whether there is any text to extract. With ocr=True, pages that came
+    out empty and are image-only are returned as OCR candidates. Returns
+    an ExtractionResult with the probe decision and timings. trace_parent
+    continues the caller's trace (see tracing.Span.context()).
+
+    In a process set up with init_extract_process(), the whole extraction
+    gets a time budget scaled by page count and file size (see limits).
+    Running out of time, memory or limits.output_mb ends it early with the
+    pages spooled so far (ExtractionResult.partial).
+    """
+    with span("extract_to_spool", trace_parent, file_size=Path(pdf_path).stat().st_size) as trace:
+        result = _extract_to_spool(pdf_path, spool_path, engines, range_pages, range_jobs,
+                                   timeout, probe_pages, ocr, limits)
+        trace.set(route=result.probe.route, engine=result.engine or "", pages=result.pages,
+                  characters=result.characters, ocr_pages=len(result.ocr_pages),
+                  partial=result.partial or "")
+    return result
+
+
+def _extract_to_spool(pdf_path, spool_path, engines, range_pages, range_jobs, timeout,
+                      probe_pages, ocr, limits):
+    size = Path(pdf_path).stat().st_size
+    with time_budget(scaled_timeout(timeout, limits, size=size)):
+        probe = probe_pdf(pdf_path, probe_pages)
+    start = time.monotonic()
+    used = set()
+    empty_pages = []
+    characters = pages = 0
+    partial = None
+    max_output = limits.output_mb * 1024 * 1024
+
+    if probe.route == "no_text":
+        # Nothing for the text engines, but keep one (empty) entry per page for OCR
+        page_texts = ((n, "") for n in range(1, (probe.page_count or 0) + 1))
+    elif probe.route == "encrypted":
+        page_texts = iter(())
+    else:
+        page_texts = iter_pdf_pages(pdf_path, engines, probe.page_count, range_pages,
+                                    range_jobs, timeout, used, limits)
+
+    written = 0
+    with open(spool_path, "w", encoding="utf-8") as spool:
+        try:
+            with time_budget(scaled_timeout(timeout, limits, probe.page_count, size)):
+                for page_number, text in page_texts:
+                    if max_output and written + len(text) > max_output:
+                        partial = "output"
+                        page_texts.close()  # stop the engines now, not on garbage collection
+                        break
+                    spool.write(text if not pages else "\f" + text)
+                    spool.flush()  # if the kernel kills this process, the pages so far survive
+                    written += len(text) + 1
+                    characters += len(text.strip())
+                    pages += 1
+                    if not text.strip():
+                        empty_pages.append(page_number)
+        except LimitExceeded:
+            partial = "timeout"
+        except MemoryError:
+            partial = "memory"
+
+    ocr_pages = find_image_pages(pdf_path, empty_pages) if ocr and empty_pages else []
+    engine = "+".join(sorted(used)) or None
+    return ExtractionResult(characters, pages, engine, probe, time.monotonic() - start, ocr_pages,
+                            partial, os.getpid(), current_rss())
+
+
+def read_spool(spool_path, remove=False):
+    """Yield (page number, text) from a spool file, optionally deleting it afterwards
+
+    A process killed while writing may leave a cut-off character at the end,
+    it is replaced rather than failing the read.
+    """
+    try:
+        with open(spool_path, "r", encoding="utf-8", errors="replace") as spool:
+            yield from split_pages(iter(lambda: spool.read(64 * 1024), ""))
+    finally:
+        if remove:
+            Path(spool_path).unlink(missing_ok=True)
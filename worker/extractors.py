@@ -0,0 +1,168 @@
+"""
+Extraction Engines
+Registry of PDF text engines behind a common page-streaming interface
+"""
+
+import codecs
+import shutil
+import subprocess
+import threading
+
+from PyPDF2 import PdfReader
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # optional in-process engine
+    pdfium = None
+
+EXTRACTORS = {}
+
+# PDFium is not thread-safe, even across documents; the engine chain of
+# parallel page ranges may still reach it from several threads
+_PDFIUM_LOCK = threading.Lock()
+
+
+def register(cls):
+    """Class decorator that adds an engine to EXTRACTORS under its name"""
+    EXTRACTORS[cls.name] = cls()
+    return cls
+
+
+class Extractor:
+    """Common interface of all engines
+
+    iter_pages() yields the text of each page in order, one page at a time;
+    first_page/last_page are 1-based and inclusive (last_page None = to the
+    end). Errors are raised, the caller decides about fallbacks.
+    """
+
+    name = None
+    parallel_ranges = False  # several page ranges of one file may run concurrently
+
+    def available(self):
+        return True
+
+    def page_count(self, pdf_path):
+        return None
+
+    def iter_pages(self, pdf_path, first_page=1, last_page=None, timeout=30):
+        raise NotImplementedError
+
+
+@register
+class PdftotextExtractor(Extractor):
+    """poppler's pdftotext as a subprocess, pages read from its stdout as they come"""
+
+    name = "pdftotext"
+    parallel_ranges = True  # separate processes, separate cores
+
+    def available(self):
+        return shutil.which("pdftotext") is not None
+
+    def page_count(self, pdf_path):
+        result = subprocess.run(
+            ["pdfinfo", pdf_path],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        for line in result.stdout.splitlines():
+            if line.startswith("Pages:"):
+                return int(line.split()[1])
+        return None
+
+    def iter_pages(self, pdf_path, first_page=1, last_page=None, timeout=30):
+        command = ["pdftotext", "-f", str(first_page)]
+        if last_page:
+            command += ["-l", str(last_page)]
+        process = subprocess.Popen(
+            command + [pdf_path, "-"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        # Decoded here: read1() returns what is there instead of waiting for a
+        # full chunk, so pages stream even from a run that is killed later
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        # The timeout covers the whole run, not a single read
+        timer = threading.Timer(timeout, process.kill)
+        timer.start()
+        try:
+            buffer = ""
+            while True:
+                chunk = process.stdout.read1(64 * 1024)
+                if not chunk:
+                    break
+                buffer += decoder.decode(chunk)
+                *pages, buffer = buffer.split("\f")
+                yield from pages
+            if process.wait() != 0:
+                if not timer.is_alive():
+                    raise TimeoutError(f"pdftotext timed out after {timeout}s")
+                raise RuntimeError(f"pdftotext exited with {process.returncode}")
+            buffer += decoder.decode(b"", final=True)
+            if buffer.strip():
+                yield buffer
+        finally:
+            timer.cancel()
+            process.kill()
+            process.stdout.close()
+            process.wait()
+
+
+@register
+class PyPDF2Extractor(Extractor):
+    """Pure-Python PyPDF2, always available"""
+
+    name = "pypdf2"
+
+    def page_count(self, pdf_path):
+        return len(PdfReader(pdf_path).pages)
+
+    def iter_pages(self, pdf_path, first_page=1, last_page=None, timeout=30):
+        reader = PdfReader(pdf_path)
+        for page in reader.pages[first_page - 1:last_page]:
+            yield page.extract_text()
+
+
+@register
+class PdfiumExtractor(Extractor):
+    """PDFium via pypdfium2, in-process: no subprocess spawn per file
+
+    PDFium is not thread-safe, so page ranges of one file are not run in
+    parallel and every call into it holds _PDFIUM_LOCK (a fallback from
+    another engine's ranges may run concurrently); the process pool still
+    runs different files side by side.
+    """
+
+    name = "pdfium"
+
+    def available(self):
+        return pdfium is not None
+
+    def page_count(self, pdf_path):
+        with _PDFIUM_LOCK:
+            document = pdfium.PdfDocument(pdf_path)
+            try:
+                return len(document)
+            finally:
+                document.close()
+
+    def iter_pages(self, pdf_path, first_page=1, last_page=None, timeout=30):
+        with _PDFIUM_LOCK:
+            document = pdfium.PdfDocument(pdf_path)
+            page_count = len(document)
+        try:
+            for index in range(first_page - 1, min(last_page or page_count, page_count)):
+                # Lock per page, not across the yield: the consumer may be slow
+                with _PDFIUM_LOCK:
+                    page = document[index]
+                    text_page = page.get_textpage()
+                    try:
+                        text = text_page.get_text_range()
+                    finally:
+                        text_page.close()
+                        page.close()
+                yield text
+        finally:
+            with _PDFIUM_LOCK:
+                document.close()
@@ -0,0 +1,70 @@
+"""
+Index Settings
+Declarative settings for patterns_index, applied only when they differ
+"""
+
+# Fields of every document the worker writes (see PDFWorker.build_documents)
+DOCUMENT_FIELDS = (
+    "id", "pattern_id", "chunk", "page", "title", "slug", "visibility", "notes",
+    "pdf_file", "content", "date_created", "date_updated",
+)
+
+PATTERNS_INDEX_SETTINGS = {
+    # Order matters: earlier attributes rank higher
+    "searchableAttributes": ["title", "notes", "content"],
+    # id, pattern_id and chunk are needed to delete stale chunks by filter
+    "filterableAttributes": ["visibility", "date_created", "id", "pattern_id", "chunk"],
+    # One hit per pattern, even if several of its chunks match
+    "distinctAttribute": "pattern_id",
+}
+
+# Settings whose list order carries no meaning
+_UNORDERED = {"filterableAttributes", "sortableAttributes", "displayedAttributes"}
+
+
+def validate_settings(settings, document):
+    """Raise ValueError if settings name attributes the documents do not have"""
+    fields = set(document)
+    if fields != set(DOCUMENT_FIELDS):
+        raise ValueError(f"documents have fields {sorted(fields)}, "
+                         f"DOCUMENT_FIELDS lists {sorted(DOCUMENT_FIELDS)}")
+    for name, value in settings.items():
+        attributes = value if isinstance(value, list) else [value]
+        unknown = [a for a in attributes if a is not None and a != "*" and a not in fields]
+        if unknown:
+            raise ValueError(f"{name} refers to unknown fields: {', '.join(unknown)}")
+
+
+def diff_settings(current, desired):
+    """Return the desired settings that differ from the current ones"""
+    changes = {}
+    for name, value in desired.items():
+        current_value = current.get(name)
+        if name in _UNORDERED and isinstance(value, list):
+            if set(current_value or []) == set(value):
+                continue
+        elif current_value == value:
+            continue
+        changes[name] = value
+    return changes
+
+
+def sync_settings(client, index, desired, timeout_in_ms):
+    """Apply only changed settings with one update_settings call and wait for it
+
+    Every settings update can make Meilisearch re-index all documents, so a
+    restart with unchanged settings must not send any. Returns the applied
+    changes; raises if the settings task does not succeed.
+    """
+    changes = diff_settings(index.get_settings(), desired)
+    if not changes:
+        print("✅ Meilisearch settings up to date")
+        return changes
+
+    print(f"⚙️ Updating Meilisearch settings: {', '.join(changes)}")
+    task = index.update_settings(changes)
+    result = client.wait_for_task(task.task_uid, timeout_in_ms=timeout_in_ms)
+    if result.status != "succeeded":
+        error = (result.error or {}).get("message", "")
+        raise RuntimeError(f"settings update {result.status}: {error}")
+    return changes
@@ -0,0 +1,208 @@
+"""
+Batch Indexer
+Sends documents to Meilisearch in size-bounded batches and tracks their tasks
+"""
+
+import json
+import time
+
+from metrics import INDEX_BATCH_BYTES, INDEX_BATCH_DOCUMENTS, INDEX_TASK_SECONDS
+
+
+class BatchIndexer:
+    """Collect documents into batches and follow each batch's task to completion
+
+    A batch is closed when it reaches max_documents or max_bytes of JSON
+    payload and submitted with a single add_documents call. The returned
+    task uids are polled until Meilisearch reports success or failure.
+    Documents of a failed batch are re-queued in two halves, so a single
+    bad document ends up alone; only failures of a lone document count as
+    attempts, and it is given up after max_attempts.
+
+    A key (pattern) may bring several documents, e.g. its page chunks:
+    on_indexed fires once all of them succeeded, on_failed once as soon
+    as one of them is given up.
+    """
+
+    def __init__(self, client, index, max_documents, max_bytes, max_attempts, task_timeout,
+                 on_indexed, on_failed):
+        self.client = client
+        self.index = index
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+        self.max_attempts = max_attempts
+        self.task_timeout = task_timeout  # seconds drain() waits for outstanding tasks
+        self.on_indexed = on_indexed  # called with the key once all its documents are indexed
+        # called with key, error message and whether the documents were at fault
+        # (False if Meilisearch could not be reached)
+        self.on_failed = on_failed
+
+        self.batch = []  # entries: (key state, document, size, attempts)
+        self.batch_bytes = 0
+        self.cleanup_filters = []  # delete filters submitted before the next batch
+        self.pending = {}  # task uid -> entries
+        self.submitted = {}  # task uid -> monotonic submission time
+
+    def add(self, key, documents):
+        """Queue all documents of a key; submits batches as they fill up
+
+        documents may be a generator, it is consumed one document at a
+        time. Returns the number of documents, or None if producing them
+        failed (the key is then reported as failed).
+        """
+        state = {"key": key, "remaining": 0, "complete": False, "failed": False}
+        count = 0
+        try:
+            for document in documents:
+                state["remaining"] += 1
+                count += 1
+                self._add_entry(state, document, 0)
+        except Exception as e:
+            print(f"❌ Error building documents: {e}")
+            self._fail(state, str(e))
+            return None
+        state["complete"] = True
+        if state["remaining"] == 0 and not state["failed"]:
+            self.on_indexed(key)
+        return count
+
+    def cleanup(self, delete_filter):
+        """Delete documents matching a filter (e.g. stale chunks) with the next batch"""
+        self.cleanup_filters.append(delete_filter)
+
+    def _add_entry(self, state, document, attempts):
+        size = len(json.dumps(document, ensure_ascii=False).encode("utf-8"))
+        if self.batch and self.batch_bytes + size > self.max_bytes:
+            self.flush()
+        self.batch.append((state, document, size, attempts))
+        self.batch_bytes += size
+        if len(self.batch) >= self.max_documents:
+            self.flush()
+
+    def flush(self):
+        """Submit the current batch as one add_documents call"""
+        self._flush_cleanup()
+        if not self.batch:
+            return
+        entries, self.batch, self.batch_bytes = self.batch, [], 0
+        try:
+            task = self.index.add_documents([document for _, document, _, _ in entries])
+        except Exception as e:
+            self._submit_failed(entries, e)
+            return
+        self._submitted(task.task_uid, entries)
+
+    def _submitted(self, task_uid, entries):
+        """Track the task of a submitted batch (entries empty for a cleanup task)"""
+        self.pending[task_uid] = entries
+        self.submitted[task_uid] = time.monotonic()
+        if not entries:
+            return
+        size = sum(size for _, _, size, _ in entries)
+        INDEX_BATCH_DOCUMENTS.observe(len(entries))
+        INDEX_BATCH_BYTES.observe(size)
+        print(f"📤 Submitted {len(entries)} documents ({size // 1024} KiB, task {task_uid})")
+
+    def _submit_failed(self, entries, error):
+        # Meilisearch unreachable or request rejected: not a document problem
+        print(f"❌ Error submitting {len(entries)} documents: {error}")
+        for state, _, _, _ in entries:
+            self._fail(state, str(error), attempt=False)
+
+    def _flush_cleanup(self):
+        """Submit collected stale-document filters as one delete task"""
+        if not self.cleanup_filters:
+            return
+        try:
+            task = self.index.delete_documents(filter=self._cleanup_filter())
+        except Exception as e:
+            print(f"⚠️ Error deleting stale documents: {e}")
+            return
+        self._submitted(task.task_uid, [])
+
+    def _cleanup_filter(self):
+        """Take the collected stale-document filters as one filter expression"""
+        filters, self.cleanup_filters = self.cleanup_filters, []
+        return " OR ".join(f"({f})" for f in filters)
+
+    def poll(self):
+        """Check all pending tasks once and handle the finished ones"""
+        if not self.pending:
+            return
+        try:
+            tasks = self.client.get_tasks({
+                "uids": [str(uid) for uid in self.pending],
+                "limit": len(self.pending)
+            }).results
+        except Exception as e:
+            print(f"⚠️ Error polling Meilisearch tasks: {e}")
+            return
+
+        for task in tasks:
+            self._task_done(task.uid, task.status, task.error)
+
+    def _task_done(self, task_uid, status, error):
+        """Handle a polled task: count successes, retry the documents of a failed batch"""
+        if status in ("enqueued", "processing") or task_uid not in self.pending:
+            return
+        entries = self.pending.pop(task_uid)
+        INDEX_TASK_SECONDS.observe(time.monotonic() - self.submitted.pop(task_uid), status=status)
+        if not entries:
+            return  # stale-document cleanup
+        if status == "succeeded":
+            for state, _, _, _ in entries:
+                state["remaining"] -= 1
+                if state["remaining"] == 0 and state["complete"] and not state["failed"]:
+                    self.on_indexed(state["key"])
+            print(f"✅ Indexed {len(entries)} documents (task {task_uid})")
+        else:
+            error = (error or {}).get("message", status)
+            print(f"❌ Task {task_uid} {status}: {error}")
+            self._retry(entries, error)
+
+    def drain(self, interval=0.1):
+        """Submit everything and wait until all tasks are finished
+
+        Documents whose task is still unfinished after the timeout are
+        reported as failed so they are picked up again by the next cycle.
+        """
+        deadline = time.monotonic() + self.task_timeout
+        self.flush()
+        while self.pending or self.batch or self.cleanup_filters:
+            self.flush()
+            self.poll()
+            if not self.pending:
+                continue
+            if time.monotonic() > deadline:
+                self._abandon_pending()
+                break
+            time.sleep(interval)
+
+    def _abandon_pending(self):
+        for entries in self.pending.values():
+            for state, _, _, _ in entries:
+                self._fail(state, "timed out waiting for Meilisearch task", attempt=False)
+        self.pending.clear()
+        self.submitted.clear()
+
+    def _fail(self, state, error, attempt=True):
+        if not state["failed"]:
+            state["failed"] = True
+            self.on_failed(state["key"], error, attempt)
+
+    def _retry(self, entries, error):
+        """Re-queue failed documents, splitting the batch to isolate bad ones"""
+        if len(entries) > 1:
+            half = len(entries) // 2
+            for group in (entries[:half], entries[half:]):
+                for state, document, _, attempts in group:
+                    self._add_entry(state, document, attempts)
+                self.flush()
+            return
+
+        state, document, _, attempts = entries[0]
+        if attempts + 1 >= self.max_attempts:
+            self._fail(state, error)
+        else:
+            self._add_entry(state, document, attempts + 1)
+            self.flush()
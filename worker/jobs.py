@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Job Queue
+Durable retries for failed patterns with exponential backoff and a dead-letter table
+
+Usage (from worker/ or inside the replica's container, with the worker's STATE_DIR;
+with LEASE_DATABASE_URL set, the replica's subdirectory as in worker.py):
+    python jobs.py list                 # patterns waiting for their next attempt
+    python jobs.py dead                 # dead-lettered patterns with their last error
+    python jobs.py requeue [id ...]     # retry dead-lettered patterns (all without ids)
+"""
+
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from state import pattern_version
+
+
+class JobQueue:
+    """SQLite-backed retry state of failed patterns
+
+    Every failure schedules the next attempt base_delay * 2^(attempts - 1)
+    seconds later (at most max_delay). After max_attempts failures the
+    pattern moves to dead_letters with its last error and is left alone
+    until it is requeued or its PDF or timestamp changes: jobs only block
+    the version of a pattern that failed.
+    """
+
+    def __init__(self, db_path, max_attempts=5, base_delay=60, max_delay=86400):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " pattern_id TEXT PRIMARY KEY,"
+                " version TEXT,"
+                " title TEXT,"
+                " attempts INTEGER,"
+                " next_attempt REAL,"
+                " error TEXT)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS dead_letters ("
+                " pattern_id TEXT PRIMARY KEY,"
+                " version TEXT,"
+                " title TEXT,"
+                " attempts INTEGER,"
+                " error TEXT,"
+                " failed_at REAL)"
+            )
+
+    def blocked(self, pattern):
+        """True if this version of the pattern waits for a retry or is dead-lettered"""
+        pattern_id, version = str(pattern["id"]), pattern_version(pattern)
+        with self.lock:
+            waiting = self.conn.execute(
+                "SELECT 1 FROM jobs WHERE pattern_id = ? AND version = ? AND next_attempt > ?",
+                (pattern_id, version, time.time())
+            ).fetchone()
+            dead = self.conn.execute(
+                "SELECT 1 FROM dead_letters WHERE pattern_id = ? AND version = ?",
+                (pattern_id, version)
+            ).fetchone()
+        return bool(waiting or dead)
+
+    def due(self):
+        """Ids of the patterns whose next attempt is due"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT pattern_id FROM jobs WHERE next_attempt <= ? ORDER BY next_attempt",
+                (time.time(),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def failed(self, pattern, error, attempt=True, delay=None):
+        """Schedule the next attempt, or dead-letter the pattern after max_attempts
+
+        attempt=False (e.g. outages) retries without counting against the
+        pattern; delay overrides the backoff (0 = with the next cycle).
+        """
+        pattern_id, version = str(pattern["id"]), pattern_version(pattern)
+        error = str(error)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT attempts FROM jobs WHERE pattern_id = ? AND version = ?",
+                (pattern_id, version)
+            ).fetchone()
+            attempts = (row[0] if row else 0) + (1 if attempt else 0)
+            if attempts >= self.max_attempts:
+                self.conn.execute("DELETE FROM jobs WHERE pattern_id = ?", (pattern_id,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?, ?)",
+                    (pattern_id, version, pattern.get("title"), attempts, error, time.time())
+                )
+                print(f"☠️ Giving up on {pattern.get('title')} after {attempts} attempts: {error}")
+                return
+            if delay is None:
+                delay = min(self.max_delay, self.base_delay * 2 ** max(attempts - 1, 0))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?)",
+                (pattern_id, version, pattern.get("title"), attempts, time.time() + delay, error)
+            )
+        if attempt:
+            print(f"⏳ Retrying {pattern.get('title')} in {delay:.0f}s "
+                  f"(attempt {attempts}/{self.max_attempts})")
+
+    def succeeded(self, pattern):
+        self.forget([pattern["id"]])
+
+    def forget(self, pattern_ids):
+        """Drop jobs and dead letters, e.g. of indexed or deleted patterns"""
+        ids = [(str(pattern_id),) for pattern_id in pattern_ids]
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM jobs WHERE pattern_id = ?", ids)
+            self.conn.executemany("DELETE FROM dead_letters WHERE pattern_id = ?", ids)
+
+    def requeue(self, pattern_ids=None):
+        """Move dead-lettered patterns (all if pattern_ids is None) back, due now"""
+        with self.lock, self.conn:
+            query = "SELECT pattern_id, version, title, error FROM dead_letters"
+            if pattern_ids is None:
+                rows = self.conn.execute(query).fetchall()
+            else:
+                rows = [row for pattern_id in pattern_ids for row in self.conn.execute(
+                    f"{query} WHERE pattern_id = ?", (str(pattern_id),)
+                )]
+            for pattern_id, version, title, error in rows:
+                self.conn.execute("DELETE FROM dead_letters WHERE pattern_id = ?", (pattern_id,))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, 0, 0, ?)",
+                    (pattern_id, version, title, error)
+                )
+        return len(rows)
+
+    def jobs(self):
+        """(pattern id, title, attempts, next attempt, last error) of the waiting jobs"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT pattern_id, title, attempts, next_attempt, error FROM jobs"
+                " ORDER BY next_attempt"
+            ).fetchall()
+
+    def dead_letters(self):
+        """(pattern id, title, attempts, failed at, last error) of the dead-lettered patterns"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT pattern_id, title, attempts, failed_at, error FROM dead_letters"
+                " ORDER BY failed_at"
+            ).fetchall()
+
+    def count(self, table):
+        with self.lock:
+            return self.conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and requeue the PDF worker's failed jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="patterns waiting for their next attempt")
+    commands.add_parser("dead", help="dead-lettered patterns")
+    requeue = commands.add_parser("requeue", help="retry dead-lettered patterns with the next cycle")
+    requeue.add_argument("pattern_ids", nargs="*", help="pattern ids (default: all)")
+    args = parser.parse_args()
+
+    state_dir = os.getenv("STATE_DIR", "/app/data")
+    if os.getenv("LEASE_DATABASE_URL"):
+        state_dir = os.path.join(state_dir, os.getenv("REPLICA_NAME") or socket.gethostname())
+    queue = JobQueue(os.path.join(state_dir, "jobs.db"))
+    if args.command == "requeue":
+        count = queue.requeue(args.pattern_ids or None)
+        print(f"🔁 Requeued {count} patterns")
+        return
+
+    rows = queue.jobs() if args.command == "list" else queue.dead_letters()
+    for pattern_id, title, attempts, when, error in rows:
+        when = datetime.fromtimestamp(when).isoformat(" ", "seconds")
+        print(f"{pattern_id}  {title}  attempts={attempts}  "
+              f"{'next' if args.command == 'list' else 'failed'}={when}\n    {error}")
+    print(f"{len(rows)} {'waiting' if args.command == 'list' else 'dead-lettered'} patterns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Pattern Leases
+Expiring per-pattern leases in Postgres, so several worker replicas split the work
+"""
+
+import os
+import socket
+import threading
+import time
+
+try:
+    import psycopg
+except ImportError:  # only needed with LEASE_DATABASE_URL
+    psycopg = None
+
+from state import pattern_version
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_worker_leases (
+    pattern_id TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    owner TEXT,
+    expires_at TIMESTAMPTZ NOT NULL
+)
+"""
+
+# Take a row if it is free (expired or ours) and not already done for this
+# version; a done lease has no owner and stays as a record for the peers
+CLAIM = """
+INSERT INTO pdf_worker_leases (pattern_id, version, owner, expires_at)
+SELECT pattern_id, version, %(owner)s, now() + %(ttl)s * interval '1 second'
+FROM unnest(%(ids)s::text[], %(versions)s::text[]) AS claim (pattern_id, version)
+ON CONFLICT (pattern_id) DO UPDATE
+SET version = excluded.version, owner = excluded.owner, expires_at = excluded.expires_at
+WHERE (pdf_worker_leases.expires_at < now() OR pdf_worker_leases.owner = excluded.owner)
+  AND NOT (pdf_worker_leases.owner IS NULL AND pdf_worker_leases.version = excluded.version)
+RETURNING pattern_id
+"""
+
+
+def leases_available():
+    return psycopg is not None
+
+
+class LeaseStore:
+    """Work claiming between replicas that share a Postgres database
+
+    A replica only processes patterns it holds a lease for. Leases expire
+    after ttl seconds and are renewed by a heartbeat thread every ttl/3,
+    so the leases of a crashed replica are taken over once they expire.
+    A finished lease keeps the pattern's version without an owner, so
+    peers whose local state is behind skip the pattern instead of
+    indexing it again. A connection lost to a database restart or failover
+    is re-opened on the next statement.
+    """
+
+    def __init__(self, dsn, ttl=300, owner=None):
+        self.dsn = dsn
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+        self.conn = psycopg.connect(dsn, autocommit=True)
+        self.conn.execute(SCHEMA)
+        self.held = set()
+        self.lock = threading.Lock()
+        threading.Thread(target=self._heartbeat, name="lease-heartbeat", daemon=True).start()
+
+    def claim(self, patterns):
+        """Try to lease patterns; returns (claimed ids, ids a peer already finished)
+
+        All other ids are leased by a live peer.
+        """
+        ids = [str(pattern["id"]) for pattern in patterns]
+        if not ids:
+            return set(), set()
+        with self.lock:
+            claimed = {row[0] for row in self._execute(CLAIM, {
+                "owner": self.owner, "ttl": self.ttl, "ids": ids,
+                "versions": [pattern_version(pattern) for pattern in patterns]
+            })}
+            self.held |= claimed
+            done = {row[0] for row in self._execute(
+                "SELECT pattern_id FROM pdf_worker_leases"
+                " WHERE pattern_id = ANY(%s) AND owner IS NULL",
+                ([i for i in ids if i not in claimed],)
+            )}
+        return claimed, done
+
+    def finish(self, pattern):
+        """Mark a leased pattern as done for its current version"""
+        self._end(pattern, "owner = NULL, expires_at = '-infinity'")
+
+    def release(self, pattern):
+        """Give a lease back without finishing it (failed or deferred), any replica may retry"""
+        self._end(pattern, "expires_at = now()")
+
+    def _end(self, pattern, assignment):
+        pattern_id = str(pattern["id"])
+        with self.lock:
+            if pattern_id not in self.held:
+                return
+            self.held.discard(pattern_id)
+            self._execute(
+                f"UPDATE pdf_worker_leases SET {assignment}"
+                " WHERE pattern_id = %s AND owner = %s",
+                (pattern_id, self.owner)
+            )
+
+    def _execute(self, query, params=None):
+        """Run a statement (lock held), reconnecting once if the connection is gone
+
+        All statements are idempotent for this owner, so repeating one after
+        a reconnect is safe.
+        """
+        try:
+            return self.conn.execute(query, params)
+        except psycopg.OperationalError:
+            if not (self.conn.broken or self.conn.closed):
+                raise
+            print("⚠️ Lease database connection lost, reconnecting")
+            self.conn.close()
+            self.conn = psycopg.connect(self.dsn, autocommit=True)
+            return self.conn.execute(query, params)
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.ttl / 3)
+            try:
+                with self.lock:
+                    if self.held:
+                        self._execute(
+                            "UPDATE pdf_worker_leases"
+                            " SET expires_at = now() + %s * interval '1 second'"
+                            " WHERE owner = %s AND pattern_id = ANY(%s)",
+                            (self.ttl, self.owner, list(self.held))
+                        )
+            except Exception as e:
+                # Leases expiring is fine: peers take over, nothing is lost
+                print(f"⚠️ Lease heartbeat failed: {e}")
+
+    def count(self):
+        return len(self.held)
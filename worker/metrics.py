@@ -0,0 +1,213 @@
+"""
+Worker Metrics
+Prometheus counters, gauges and histograms with an optional /metrics endpoint
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REGISTRY = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SLOW_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000)
+BYTES_BUCKETS = tuple(1024 * 4 ** n for n in range(10))  # 1 KiB .. 256 MiB
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric; each distinct set of label values is its own series
+
+    Updates take one lock and touch one dict entry, so recording is cheap
+    enough to stay on whether or not anything scrapes the endpoint.
+    """
+
+    kind = None
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.series = {}  # sorted label items -> value
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            series = list(self.series.items())
+        for labels, value in sorted(series):
+            lines.extend(self._render_series(labels, value))
+        return lines
+
+    def _render_series(self, labels, value):
+        yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Gauge with a fixed value or a function read at scrape time (e.g. queue sizes)"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.series[tuple(sorted(labels.items()))] = value
+
+    def remove(self, **labels):
+        """Drop a series, e.g. of a process that is gone"""
+        with self.lock:
+            self.series.pop(tuple(sorted(labels.items())), None)
+
+    def _render_series(self, labels, value):
+        yield from super()._render_series(labels, value() if callable(value) else value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                # per-bucket counts (last one is +Inf), sum, count
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with block (also when it raises)"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def _render_series(self, labels, value):
+        counts, total, count = value[0][:], value[1], value[2]
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            bucket_labels = labels + (("le", _format_value(float(bound))),)
+            yield f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(labels)} {_format_value(float(total))}"
+        yield f"{self.name}_count{_format_labels(labels)} {count}"
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Worker metrics
+DIRECTUS_FETCH_SECONDS = Histogram(
+    "pdfworker_directus_fetch_seconds", "Latency of Directus pattern listing requests"
+)
+DOWNLOAD_SECONDS = Histogram(
+    "pdfworker_download_seconds", "PDF download duration by result status", SLOW_BUCKETS
+)
+DOWNLOAD_BYTES = Counter("pdfworker_download_bytes_total", "PDF bytes downloaded from Directus")
+EXTRACT_SECONDS_PER_PAGE = Histogram(
+    "pdfworker_extract_seconds_per_page", "Text extraction time per page by engine"
+)
+EXTRACT_PAGES = Counter("pdfworker_extract_pages_total", "Pages extracted by engine")
+EXTRACT_PARTIAL = Counter("pdfworker_extract_partial_total", "Extractions cut short by reason")
+EXTRACT_CHILD_RSS = Gauge(
+    "pdfworker_extract_child_rss_bytes", "Resident memory of each extraction process after a job"
+)
+EXTRACT_RECYCLED = Counter(
+    "pdfworker_extract_recycled_total", "Extraction processes replaced, by reason (jobs or rss)"
+)
+OCR_PAGES = Counter("pdfworker_ocr_pages_total", "OCR pages by result (cache, tesseract or failed)")
+OCR_CPU_SECONDS = Counter("pdfworker_ocr_cpu_seconds_total", "CPU seconds used by Tesseract OCR")
+NORMALIZE_BYTES = Counter(
+    "pdfworker_normalize_bytes_total", "Text bytes before (raw) and after (normalized) normalization"
+)
+INDEX_BATCH_DOCUMENTS = Histogram(
+    "pdfworker_index_batch_documents", "Documents per Meilisearch batch", SIZE_BUCKETS
+)
+INDEX_BATCH_BYTES = Histogram(
+    "pdfworker_index_batch_bytes", "JSON payload bytes per Meilisearch batch", BYTES_BUCKETS
+)
+INDEX_TASK_SECONDS = Histogram(
+    "pdfworker_index_task_seconds", "Time from batch submission to finished Meilisearch task",
+    SLOW_BUCKETS
+)
+QUEUE_DEPTH = Gauge("pdfworker_queue_depth", "Items waiting in each pipeline queue")
+JOBS = Gauge("pdfworker_jobs", "Failed patterns waiting for a retry or dead-lettered")
+LEASES_HELD = Gauge("pdfworker_leases_held", "Pattern leases held by this replica")
+PATTERNS = Counter("pdfworker_patterns_total", "Patterns processed by result")
+TIME_TO_SEARCHABLE = Histogram(
+    "pdfworker_time_to_searchable_seconds",
+    "Time from a pattern entering the pipeline until its documents are searchable",
+    SLOW_BUCKETS
+)
+
+
+class MetricsServer:
+    """HTTP listener serving the registry on GET /metrics"""
+
+    def __init__(self, port):
+        self.server = ThreadingHTTPServer(("0.0.0.0", port), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    @staticmethod
+    def _handler():
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0].rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                data = render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
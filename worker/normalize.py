@@ -0,0 +1,113 @@
+"""
+Text Normalization
+Strips running headers/footers, rejoins hyphenated words and collapses whitespace before indexing
+"""
+
+import re
+from collections import Counter
+
+SAMPLE_PAGES = 50  # pages held back to learn a document's headers and footers
+EDGE_LINES = 2  # lines at the top and bottom of a page that may be a header or footer
+MIN_PAGES = 3  # shorter documents are not searched for headers and footers
+MIN_SHARE = 0.5  # share of the sampled pages a line must repeat on
+
+_DIGITS = re.compile(r"\d+")
+# A page number: a whole line like "12", "- 12 -" or "12/40", or "Seite 12 von 40"
+# (also "page", "s.", "p.") on its own or at the end of a footer
+_PAGE_NUMBER = re.compile(
+    r"(?:^[-–—]?\s*\d+(?:\s*/\s*\d+)?\s*[-–—]?$"
+    r"|(?:^|\s)(?:seite|page|s\.|p\.)\s*\d+(?:\s*(?:/|von|of)\s*\d+)?$)"
+)
+_SPACES = re.compile(r"[ \t\r\v\u00a0]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+# A word split at the end of a line, continued in lower case on the next one;
+# not before conjunctions ("Vorder- und Rückenteil")
+_HYPHENATED = re.compile(r"(\w)-\n(?!(?:und|oder|bzw|and|or)\b)(?=[a-zäöüß])")
+
+
+def _line_key(line):
+    """Whitespace-collapsed, lower-cased line; the digits of a page number are ignored
+
+    Only page numbers are wildcarded: pattern rows such as "Reihe 1: 2 re,
+    2 li" differ from page to page in their numbers and must not match.
+    """
+    key = " ".join(line.split()).lower()
+    match = _PAGE_NUMBER.search(key)
+    if match:
+        key = key[:match.start()] + _DIGITS.sub("#", match.group())
+    return key
+
+
+def _edge_keys(text):
+    """("top" or "bottom", key) of the lines at both edges of a page"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    return ({("top", _line_key(line)) for line in lines[:EDGE_LINES]}
+            | {("bottom", _line_key(line)) for line in lines[-EDGE_LINES:]})
+
+
+class PageNormalizer:
+    """Normalizes one document's pages as they stream to the indexer
+
+    The first SAMPLE_PAGES pages are held back to find its headers and
+    footers: lines among the top (bottom) EDGE_LINES of a page that are
+    at the same edge on at least MIN_SHARE of the sampled pages, page
+    numbers ignored. Only an unbroken run of them at that edge is removed, so
+    repeated lines in the body (e.g. pattern rows) stay. bytes_in and
+    bytes_out count the UTF-8 size before and after.
+    """
+
+    def __init__(self):
+        self.boilerplate = set()
+        self.bytes_in = self.bytes_out = 0
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_in - self.bytes_out
+
+    def normalize(self, pages):
+        """Yield (page number, text) from (page number, text) pairs, normalized"""
+        pages = iter(pages)
+        sample = []
+        for page in pages:
+            sample.append(page)
+            if len(sample) >= SAMPLE_PAGES:
+                break
+        self.boilerplate = self._find_boilerplate([text for _, text in sample])
+
+        for page_number, text in sample:
+            yield page_number, self._normalize_page(text)
+        for page_number, text in pages:
+            yield page_number, self._normalize_page(text)
+
+    @staticmethod
+    def _find_boilerplate(texts):
+        texts = [text for text in texts if text.strip()]
+        if len(texts) < MIN_PAGES:
+            return set()
+        counts = Counter(key for text in texts for key in _edge_keys(text))
+        threshold = max(MIN_PAGES, MIN_SHARE * len(texts))
+        return {key for key, count in counts.items() if count >= threshold and key[1]}
+
+    def _normalize_page(self, text):
+        self.bytes_in += len(text.encode("utf-8"))
+        lines = [_SPACES.sub(" ", line).strip() for line in text.splitlines()]
+        if self.boilerplate:
+            lines = self._strip_edges(lines)
+        text = _HYPHENATED.sub(r"\1", "\n".join(lines))
+        text = _BLANK_LINES.sub("\n\n", text).strip()
+        self.bytes_out += len(text.encode("utf-8"))
+        return text
+
+    def _strip_edges(self, lines):
+        """Blank the header lines at the top and the footer lines at the bottom of a page"""
+        for edge, indexes in (("top", range(len(lines))),
+                              ("bottom", range(len(lines) - 1, -1, -1))):
+            seen = 0
+            for index in indexes:
+                if not lines[index]:
+                    continue
+                if seen >= EDGE_LINES or (edge, _line_key(lines[index])) not in self.boilerplate:
+                    break
+                lines[index] = ""
+                seen += 1
+        return lines
@@ -0,0 +1,458 @@
+"""
+PDF Processing Pipeline
+Download -> extract (-> OCR) -> index as separate stages connected by bounded queues
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from extraction import ExtractionResult, ProbeResult, extract_to_spool, read_spool
+from metrics import (EXTRACT_PAGES, EXTRACT_PARTIAL, EXTRACT_SECONDS_PER_PAGE, OCR_CPU_SECONDS,
+                     OCR_PAGES, PATTERNS, QUEUE_DEPTH, TIME_TO_SEARCHABLE)
+from ocr import CpuBudget, ocr_page
+from tracing import current_context, span, start_span
+
+_DONE = object()  # End-of-stream marker passed through the queues
+
+
+class Pipeline:
+    """Staged pipeline for one batch of patterns
+
+    - a pool of download threads (network bound)
+    - extraction in the worker's process pool, one feeding thread per process
+    - an OCR lane with its own threads for image-only pages, so scans never
+      occupy the extraction pool; it stops at a CPU-seconds budget per sweep
+    - a single indexer thread that sends documents to Meilisearch in batches
+
+    Every queue is bounded, so a slow stage blocks the stage before it
+    instead of piling up downloaded PDFs on disk or texts in memory.
+    """
+
+    def __init__(self, worker, download_workers, extract_workers, queue_size,
+                 ocr_workers=0, ocr_budget=None):
+        self.worker = worker
+        self.download_workers = download_workers
+        self.extract_workers = extract_workers
+        self.ocr_workers = ocr_workers
+        self.ocr_budget = ocr_budget or CpuBudget(0)  # shared with later runs, see PDFWorker
+
+        self.download_queue = queue.Queue(maxsize=queue_size)
+        self.extract_queue = queue.Queue(maxsize=queue_size)
+        self.ocr_queue = queue.Queue(maxsize=queue_size)
+        self.index_queue = queue.Queue(maxsize=queue_size)
+        for name in ("download", "extract", "ocr", "index"):
+            QUEUE_DEPTH.set(getattr(self, f"{name}_queue").qsize, queue=name)
+
+        self.failed = []
+        self.failed_lock = threading.Lock()
+        self.open = {}  # pattern id -> admitted pattern, until it is indexed or failed
+        self.killed = set()  # ids indexed from the spool of a dead extraction process
+        self.started = {}  # pattern id -> monotonic time it entered the pipeline
+        self.traces = {}  # pattern id -> root span, ended once indexed or failed
+        self.index_spans = {}  # pattern id -> index_pattern span
+
+    def run(self, patterns):
+        """Process all patterns and return the ones that have to be retried
+
+        patterns may be a lazy iterator; it is consumed at the pace of the
+        download stage. If it raises, the stages are still shut down cleanly
+        before the error propagates.
+        """
+        downloaders = self._start_stage("download", self._download, self.download_queue,
+                                        self.extract_queue, self.download_workers)
+        extractors = self._start_stage("extract", self._extract, self.extract_queue,
+                                       self.index_queue, self.extract_workers)
+        ocr_threads = self._start_stage("ocr", self._ocr, self.ocr_queue,
+                                        self.index_queue, self.ocr_workers)
+        indexer = threading.Thread(target=self._index_loop, name="index", daemon=True)
+        indexer.start()
+
+        try:
+            for pattern in patterns:
+                if pattern.get("pdf_file"):
+                    self._admit(pattern)
+                    self.download_queue.put((pattern,))
+        finally:
+            # Shut the stages down in order once their input is exhausted
+            self._finish_stage(downloaders, self.download_queue)
+            self._finish_stage(extractors, self.extract_queue)
+            self._finish_stage(ocr_threads, self.ocr_queue)
+            self.index_queue.put(_DONE)
+            indexer.join()
+            self._fail_unfinished()
+
+        return self.failed
+
+    def _start_stage(self, name, func, inbox, outbox, workers):
+        """Start worker threads that apply func to queue items (tuples starting with the pattern)"""
+        def loop():
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    return
+                try:
+                    # One span per stage and pattern, in the pattern's trace
+                    with span(name, self._trace(item[0]), pattern_id=str(item[0]["id"])):
+                        result = func(*item)
+                except Exception as e:
+                    print(f"❌ {name} failed for pattern {item[0]['id']}: {e}")
+                    self._fail(item[0], error=e)
+                    continue
+                if result is not None:
+                    outbox.put(result)
+
+        threads = [
+            threading.Thread(target=loop, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    @staticmethod
+    def _finish_stage(threads, inbox):
+        for _ in threads:
+            inbox.put(_DONE)
+        for thread in threads:
+            thread.join()
+
+    def _admit(self, pattern):
+        """Start the clock and the trace of a pattern entering the pipeline"""
+        self.open[str(pattern["id"])] = pattern
+        self.started[str(pattern["id"])] = time.monotonic()
+        self.traces[str(pattern["id"])] = start_span(
+            "process_pattern", pattern_id=str(pattern["id"]), pdf_file=pattern["pdf_file"]
+        )
+
+    def _fail(self, pattern, result="failed", error=None, attempt=True):
+        """Report a pattern as not indexed; the job queue schedules its retry
+
+        attempt=False for failures that are not the PDF's fault (Directus or
+        Meilisearch unreachable, OCR budget), they never dead-letter it.
+        Only the first report of a pattern counts; never raises.
+        """
+        if self.open.pop(str(pattern["id"]), None) is None:
+            return
+        PATTERNS.inc(result=result)
+        self._end_trace(pattern, result, error)
+        with self.failed_lock:
+            self.failed.append(pattern)
+        try:
+            self.worker.jobs.failed(pattern, error or result,
+                                    attempt=attempt and result == "failed",
+                                    delay=0 if result == "deferred" else None)
+            if self.worker.leases:
+                self.worker.leases.release(pattern)
+        except Exception as e:
+            print(f"⚠️ Could not queue the retry of {pattern['title']}: {e}")
+
+    def _indexed(self, pattern):
+        """Record a pattern as indexed; if that fails it is reported as failed instead"""
+        if str(pattern["id"]) not in self.open:
+            return
+        if str(pattern["id"]) in self.killed:
+            # Its pages are searchable now; the job queue re-extracts it in full. Not
+            # charged: a broken pool fails every job in it, not only the culprit
+            self._fail(pattern, error="extraction process died, partial text indexed",
+                       attempt=False)
+            return
+        try:
+            self.worker.state.mark_processed(pattern)
+            self.worker.jobs.succeeded(pattern)
+        except Exception as e:
+            print(f"❌ Could not record {pattern['title']} as indexed: {e}")
+            self._fail(pattern, error=e, attempt=False)
+            return
+        self.open.pop(str(pattern["id"]), None)
+        if self.worker.leases:
+            try:
+                self.worker.leases.finish(pattern)
+            except Exception as e:
+                # The lease expires by itself; a peer may index the pattern once more
+                print(f"⚠️ Could not finish the lease of {pattern['title']}: {e}")
+        PATTERNS.inc(result="indexed")
+        self._end_trace(pattern, "indexed")
+        started = self.started.pop(str(pattern["id"]), None)
+        if started is not None:
+            TIME_TO_SEARCHABLE.observe(time.monotonic() - started)
+
+    def _fail_unfinished(self):
+        """Report patterns the stages dropped (e.g. after an indexer error) as failed"""
+        for pattern in list(self.open.values()):
+            self._fail(pattern, error="pipeline ended before the pattern was indexed",
+                       attempt=False)
+
+    def _trace(self, pattern):
+        """Root span of a pattern, parent of its stage spans (None if not traced)"""
+        return self.traces.get(str(pattern["id"]))
+
+    def _end_trace(self, pattern, result, error=None):
+        for spans in (self.index_spans, self.traces):
+            trace = spans.pop(str(pattern["id"]), None)
+            if trace is not None:
+                trace.set(result=result)
+                if error:
+                    trace.fail(error)
+                trace.end()
+
+    def _download(self, pattern):
+        """Download stage: serve from the cache or fetch the PDF"""
+        print(f"\n📖 Processing: {pattern['title']}")
+        cache = self.worker.cache
+        file_id = pattern["pdf_file"]
+
+        # Metadata-only edit: same file version, no download needed
+        sha256 = cache.lookup_file(file_id, pattern.get("pdf_version"))
+        if sha256 is not None:
+            print("  Using cached text")
+            self.index_queue.put((pattern, cache.iter_pages(sha256)))
+            return None
+
+        sha256, etag = cache.last_download(file_id)
+        download = self._download_pdf(pattern, etag)
+        if download is not None and download.status == "not_modified":
+            if cache.has(sha256):
+                print("  PDF unchanged (304), using cached text")
+                cache.link(file_id, pattern.get("pdf_version"), sha256, download.etag)
+                self.index_queue.put((pattern, cache.iter_pages(sha256)))
+                return None
+            # Text was evicted in the meantime
+            download = self._download_pdf(pattern)
+
+        if download is None:
+            self._fail(pattern, error="download failed", attempt=False)
+            return None
+        if download.status == "too_large":
+            self.index_queue.put((pattern, iter(())))
+            return None
+
+        if cache.has(download.sha256):
+            print("  Using cached text for identical PDF")
+            Path(download.path).unlink(missing_ok=True)
+            cache.link(file_id, pattern.get("pdf_version"), download.sha256, download.etag)
+            self.index_queue.put((pattern, cache.iter_pages(download.sha256)))
+            return None
+
+        return pattern, download
+
+    def _download_pdf(self, pattern, etag=None):
+        """Download with a span of its own inside the download stage span"""
+        with span("download_pdf", pattern_id=str(pattern["id"]),
+                  file_id=pattern["pdf_file"]) as trace:
+            download = self.worker.download_pdf(pattern["pdf_file"], etag)
+            if download is None:
+                trace.fail("download failed")
+            else:
+                trace.set(status=download.status, file_size=download.size)
+        return download
+
+    def _extract(self, pattern, download):
+        """Extraction stage: run the CPU-bound extraction in the process pool
+
+        The child writes the pages to a spool file next to the PDF; the
+        cache and the indexer both read it page by page.
+        """
+        spool_path = f"{download.path}.txt"
+        pool = None  # stays None if even the restarted pool refuses the job
+        try:
+            pool, future = self.worker.submit_extraction(
+                extract_to_spool, download.path, spool_path, **self.worker.extract_options,
+                trace_parent=current_context()
+            )
+            result = future.result()
+        except BrokenProcessPool as e:
+            return self._extraction_crashed(pattern, download, spool_path, pool, e)
+        except Exception:
+            self._discard(download.path, spool_path)
+            raise
+
+        self.worker.extraction_finished(pool, result)
+        self._extraction_done(pattern, result)
+        if result.ocr_pages and self.ocr_workers:
+            # Keep the PDF, the OCR lane renders the pages from it
+            print(f"  {len(result.ocr_pages)} image-only pages queued for OCR")
+            self.ocr_queue.put((pattern, download, spool_path, result))
+            return None
+
+        Path(download.path).unlink(missing_ok=True)
+        return self._store_text(pattern, download, spool_path, result)
+
+    def _extraction_crashed(self, pattern, download, spool_path, pool, error):
+        """A child died (e.g. OOM on a pathological PDF) and broke the whole pool
+
+        Every job in the pool fails with it, not only the one whose PDF
+        caused it. The pages a job spooled before that are indexed (partial
+        "killed", never cached), and the pattern is then queued for another
+        attempt in full (see _indexed). Neither case is charged an attempt,
+        since the crash cannot be pinned on one job; a job's own timeout or
+        memory limit ends in a partial result instead (see _extraction_done),
+        which is indexed and not retried. pool is None if the job was never accepted
+        (submit_extraction() already restarted the pool once). Returns
+        (pattern, pages) or None.
+        """
+        print(f"❌ Extraction of {pattern['title']} failed: an extraction process died")
+        Path(download.path).unlink(missing_ok=True)
+        if pool is not None:
+            self.worker.reset_extract_pool(pool)
+        characters = pages = 0
+        if Path(spool_path).exists() and Path(spool_path).stat().st_size:
+            for _, text in read_spool(spool_path):
+                characters += len(text.strip())
+                pages += 1
+        if not characters:
+            self._discard(spool_path)
+            self._fail(pattern, error=error, attempt=False)
+            return None
+
+        probe = ProbeResult("unknown", None, None, 0, 0, 0, 0)
+        self._extraction_done(pattern, ExtractionResult(characters, pages, None, probe, 0, [],
+                                                        "killed", None, 0))
+        self.killed.add(str(pattern["id"]))
+        return pattern, read_spool(spool_path, remove=True)
+
+    @staticmethod
+    def _extraction_done(pattern, result):
+        """Log the probe decision and the extraction, record its metrics"""
+        probe = result.probe
+        print(f"  Probe: {probe.route} ({probe.text_pages}/{probe.probed_pages} text pages, "
+              f"{probe.seconds * 1000:.0f} ms) -> {result.engine or 'skipped'}")
+        print(f"  Extracted {result.characters} characters ({result.pages} pages) "
+              f"from {pattern['title']}")
+        if result.partial:
+            # Indexed anyway: what was extracted is searchable; a retry would hit the
+            # same limit (a killed extraction is retried once indexed)
+            print(f"⚠️ Extraction stopped early ({result.partial}), keeping {result.pages} pages")
+            EXTRACT_PARTIAL.inc(reason=result.partial)
+        if result.pages:
+            engine = result.engine or probe.route
+            EXTRACT_PAGES.inc(result.pages, engine=engine)
+            EXTRACT_SECONDS_PER_PAGE.observe(result.seconds / result.pages, engine=engine)
+
+    def _ocr(self, pattern, download, spool_path, result):
+        """OCR stage: fill the image-only pages of the spool file
+
+        Pages come from the per-page OCR cache or from Tesseract. Once the
+        run's CPU budget is used up the pattern is deferred (reported as
+        failed); the next cycle resumes from the cached pages.
+        """
+        cache = self.worker.cache
+        options = self.worker.ocr_options
+        languages = options["languages"]
+        ocr_pages = set(result.ocr_pages)
+        merged_path = f"{spool_path}.ocr"
+        recognized = 0
+        try:
+            with open(merged_path, "w", encoding="utf-8") as merged:
+                for page_number, text in read_spool(spool_path):
+                    if page_number in ocr_pages:
+                        text = cache.get_ocr_page(download.sha256, page_number, languages)
+                        if text is None:
+                            if not self.ocr_budget.available():
+                                print(f"  ⏳ OCR budget used up, deferring {pattern['title']} "
+                                      f"({recognized}/{len(ocr_pages)} pages done)")
+                                self._fail(pattern, result="deferred")
+                                self._discard(download.path, spool_path, merged_path)
+                                return None
+                            text = self._ocr_page(download, page_number, options)
+                        else:
+                            OCR_PAGES.inc(result="cache")
+                        recognized += 1
+                    merged.write(text if page_number == 1 else "\f" + text)
+            Path(merged_path).replace(spool_path)
+        except Exception:
+            self._discard(download.path, spool_path, merged_path)
+            raise
+        Path(download.path).unlink(missing_ok=True)
+
+        print(f"  OCR: {len(ocr_pages)} pages of {pattern['title']}")
+        return self._store_text(pattern, download, spool_path, result)
+
+    def _ocr_page(self, download, page_number, options):
+        """OCR a single page, charge the budget and cache the text"""
+        try:
+            text, cpu_seconds = ocr_page(download.path, page_number, **options)
+        except Exception as e:
+            # A broken page must not block the rest of the document forever
+            print(f"  ⚠️ OCR failed on page {page_number}: {e}")
+            OCR_PAGES.inc(result="failed")
+            return ""
+        OCR_PAGES.inc(result="tesseract")
+        OCR_CPU_SECONDS.inc(cpu_seconds)
+        self.ocr_budget.charge(cpu_seconds)
+        self.worker.cache.put_ocr_page(download.sha256, page_number, options["languages"],
+                                       text, cpu_seconds)
+        return text
+
+    def _store_text(self, pattern, download, spool_path, result):
+        """Record the extraction, cache the spooled text and hand it on to the indexer
+
+        Partial text is not cached: with other limits or a fresh process the
+        next extraction of the same PDF may get further.
+        """
+        try:
+            self.worker.state.record_extraction(pattern["pdf_file"], result)
+            if not result.partial:
+                self.worker.cache.put(pattern["pdf_file"], pattern.get("pdf_version"),
+                                      download.sha256, read_spool(spool_path), download.etag)
+        except Exception:
+            Path(spool_path).unlink(missing_ok=True)
+            raise
+        return pattern, read_spool(spool_path, remove=True)
+
+    @staticmethod
+    def _discard(*paths):
+        for path in paths:
+            Path(path).unlink(missing_ok=True)
+
+    def _index_loop(self):
+        """Indexer stage: batch documents and follow their Meilisearch tasks"""
+        indexer = self.worker.create_indexer(
+            on_indexed=self._indexed,
+            on_failed=lambda pattern, error, attempt: self._fail(pattern, error=error,
+                                                                 attempt=attempt)
+        )
+        # Errors must not end this thread: the stages before it would block on
+        # the full index queue. Patterns they leave unfinished fail at the end of run().
+        while True:
+            try:
+                # Submit a partial batch once no new document arrived for a moment
+                item = self.index_queue.get(timeout=0.5)
+            except queue.Empty:
+                try:
+                    indexer.flush()
+                    indexer.poll()
+                except Exception as e:
+                    print(f"⚠️ Indexer error: {e}")
+                continue
+
+            if item is _DONE:
+                try:
+                    indexer.drain()
+                except Exception as e:
+                    print(f"❌ Indexer error while draining: {e}")
+                return
+
+            try:
+                self._index_item(indexer, *item)
+            except Exception as e:
+                print(f"❌ index failed for pattern {item[0]['id']}: {e}")
+                self._fail(item[0], error=e, attempt=False)
+
+    def _index_item(self, indexer, pattern, pages):
+        """Queue the documents of one pattern and the deletion of its stale ones
+
+        pages: lazy (page number, text) pairs from the cache or a spool file
+        """
+        # Ends when the pattern's last Meilisearch task finished (see _end_trace)
+        trace = start_span("index_pattern", self._trace(pattern), pattern_id=str(pattern["id"]))
+        self.index_spans[str(pattern["id"])] = trace
+        count = indexer.add(pattern, self.worker.build_documents(pattern, pages))
+        if count is None:
+            return
+        trace.set(documents=count)
+        if count == 0:
+            print(f"  ⚠️ No text extracted from PDF of {pattern['title']}")
+        indexer.cleanup(self.worker.stale_documents_filter(pattern, count))
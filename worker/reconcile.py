@@ -0,0 +1,100 @@
+"""
+Orphan Reconciliation
+Removes documents from patterns_index whose pattern or PDF no longer exists
+"""
+
+import sqlite3
+from pathlib import Path
+
+
+class OrphanReconciler:
+    """Set difference between Directus and Meilisearch ids, spilled to SQLite
+
+    Both sides are streamed page by page: Directus ids go into a scratch
+    table, Meilisearch documents are checked against it by pattern_id
+    (chunked documents) or id one page at a time and the misses collected
+    in a second table. Orphans are deleted only after
+    the scan, because deleting while paging by offset would skip documents.
+    Every replica runs this pass, so before a batch is deleted its patterns
+    are looked up in Directus again: one created and indexed by a peer
+    during the scan is not an orphan.
+    """
+
+    def __init__(self, worker, db_path, page_size, delete_batch_size):
+        self.worker = worker
+        self.db_path = db_path
+        self.page_size = page_size
+        self.delete_batch_size = delete_batch_size
+
+    def run(self):
+        """Run one reconciliation pass; returns the number of removed documents"""
+        Path(self.db_path).unlink(missing_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("CREATE TABLE live (id TEXT PRIMARY KEY)")
+            conn.execute("CREATE TABLE orphans (id TEXT PRIMARY KEY, pattern_id TEXT)")
+
+            live = 0
+            for pattern in self.worker.iter_patterns([{"pdf_file": {"_nnull": True}}], "id"):
+                conn.execute("INSERT OR IGNORE INTO live VALUES (?)", (str(pattern["id"]),))
+                live += 1
+            conn.commit()
+
+            indexed = 0
+            for documents in self.iter_index_documents():
+                indexed += len(documents)
+                conn.execute("CREATE TEMP TABLE page (id TEXT PRIMARY KEY, pattern_id TEXT)")
+                conn.executemany("INSERT OR IGNORE INTO page VALUES (?, ?)", documents)
+                conn.execute(
+                    "INSERT OR IGNORE INTO orphans"
+                    " SELECT id, pattern_id FROM page WHERE pattern_id NOT IN (SELECT id FROM live)"
+                )
+                conn.execute("DROP TABLE page")
+            conn.commit()
+
+            removed = 0
+            cursor = conn.execute("SELECT id, pattern_id FROM orphans")
+            while True:
+                batch = cursor.fetchmany(self.delete_batch_size)
+                if not batch:
+                    break
+                live_now = {
+                    str(pattern["id"])
+                    for pattern in self.worker.get_patterns_by_id({row[1] for row in batch})
+                    if pattern.get("pdf_file")
+                }
+                batch = [row for row in batch if row[1] not in live_now]
+                if not batch:
+                    continue
+                self.worker.delete_documents([row[0] for row in batch])
+                self.worker.state.forget({row[1] for row in batch})
+                removed += len(batch)
+
+            print(f"🧹 Reconciled: {live} patterns in Directus, {indexed} documents indexed, "
+                  f"{removed} orphans removed")
+            return removed
+        finally:
+            conn.close()
+            Path(self.db_path).unlink(missing_ok=True)
+
+    def iter_index_documents(self):
+        """Yield pages of (document id, pattern id) from patterns_index
+
+        Documents indexed before pattern_id existed use their own id.
+        """
+        offset = 0
+        while True:
+            page = self.worker.patterns_index.get_documents({
+                "fields": ["id", "pattern_id"],
+                "offset": offset,
+                "limit": self.page_size
+            })
+            documents = [
+                (str(document.id), str(getattr(document, "pattern_id", None) or document.id))
+                for document in page.results
+            ]
+            if documents:
+                yield documents
+            if len(documents) < self.page_size:
+                return
+            offset += self.page_size
@@ -0,0 +1,82 @@
+"""
+Extraction Sandbox
+Resource limits and page/size-scaled time budgets for the extraction processes
+"""
+
+import os
+import resource
+import signal
+from collections import namedtuple
+from contextlib import contextmanager
+
+# memory_mb: address space of each extraction process (0 = unlimited)
+# output_mb: text spooled per PDF before extraction stops (0 = unlimited)
+# per_page, per_mb: seconds added to the base timeout per page and per MB of PDF
+Limits = namedtuple("Limits", "memory_mb output_mb per_page per_mb")
+
+NO_LIMITS = Limits(0, 0, 0, 0)
+
+_armed = False  # time_budget() only works where init_process() installed the handler
+
+
+class LimitExceeded(Exception):
+    """An extraction used up its time budget; the pages spooled so far are kept"""
+
+
+def init_process(memory_mb=0):
+    """Cap the address space of this process and arm the timeout signal
+
+    Meant for the extraction pool's initializer. The limit is inherited by
+    the engine subprocesses (pdftotext), and an allocation beyond it fails
+    with MemoryError instead of the container being OOM-killed.
+    """
+    global _armed
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGALRM, _on_alarm)
+    _armed = True
+
+
+def _on_alarm(signum, frame):
+    raise LimitExceeded("time budget used up")
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak size where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def scaled_timeout(base, limits, pages=None, size=0):
+    """base seconds plus limits.per_page per page and limits.per_mb per MB of input"""
+    return base + limits.per_page * (pages or 0) + limits.per_mb * size / 1024 / 1024
+
+
+@contextmanager
+def time_budget(seconds):
+    """Raise LimitExceeded inside the block once seconds of wall time have passed
+
+    CPU time is capped at twice the budget as a backstop: if native code
+    never returns to Python, where the alarm is raised, the kernel ends
+    the process (SIGXCPU). A no-op outside processes set up with
+    init_process().
+    """
+    if not _armed or not seconds:
+        yield
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_limit = int(usage.ru_utime + usage.ru_stime + 2 * seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        cpu_limit = min(cpu_limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, hard))
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
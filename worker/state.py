@@ -0,0 +1,137 @@
+"""
+Worker State Store
+Remembers which patterns were already indexed so a poll only handles changes
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+def change_stamp(pattern):
+    """Timestamp of the last change of a pattern (date_updated is null until the first edit)"""
+    return pattern.get("date_updated") or pattern.get("date_created") or ""
+
+
+def pattern_version(pattern):
+    """The fields needs_processing() compares, as one string"""
+    return f"{change_stamp(pattern)}|{pattern.get('pdf_file') or ''}"
+
+
+class StateStore:
+    """SQLite-backed watermark and per-pattern processing state"""
+
+    def __init__(self, db_path):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS patterns ("
+                " id TEXT PRIMARY KEY,"
+                " date_updated TEXT,"
+                " pdf_file TEXT,"
+                " processed_at REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                " file_id TEXT PRIMARY KEY,"
+                " route TEXT,"
+                " engine TEXT,"
+                " encrypted INTEGER,"
+                " page_count INTEGER,"
+                " probed_pages INTEGER,"
+                " text_pages INTEGER,"
+                " image_pages INTEGER,"
+                " probe_seconds REAL,"
+                " extract_seconds REAL,"
+                " characters INTEGER,"
+                " recorded_at REAL)"
+            )
+
+    def get_watermark(self):
+        """Return the newest change timestamp that has been fully processed"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'watermark'"
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, value):
+        """Persist the watermark (only ever moves forward)"""
+        current = self.get_watermark()
+        if not value or (current and value <= current):
+            return
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)",
+                (value,)
+            )
+
+    def reset_on_change(self, layout):
+        """Forget all processing state if the index layout (e.g. chunking) changed
+
+        Returns True if a full re-index is needed. The first run only
+        records the layout.
+        """
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'layout'"
+            ).fetchone()
+            if row is not None and row[0] == layout:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('layout', ?)", (layout,)
+            )
+            if row is None:
+                return False
+            self.conn.execute("DELETE FROM meta WHERE key = 'watermark'")
+            self.conn.execute("DELETE FROM patterns")
+        return True
+
+    def needs_processing(self, pattern):
+        """True if the pattern is new or its timestamp / PDF changed since the last run"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT date_updated, pdf_file FROM patterns WHERE id = ?",
+                (str(pattern["id"]),)
+            ).fetchone()
+        if row is None:
+            return True
+        return row != (change_stamp(pattern), pattern.get("pdf_file"))
+
+    def mark_processed(self, pattern):
+        """Remember that the current version of a pattern has been handled"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO patterns (id, date_updated, pdf_file, processed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (str(pattern["id"]), change_stamp(pattern), pattern.get("pdf_file"), time.time())
+            )
+
+    def record_extraction(self, file_id, result):
+        """Keep the probe decision and timings of the last extraction of a file
+
+        Used to tune the engine routing against the real corpus, e.g.
+        SELECT route, engine, avg(extract_seconds) FROM extractions GROUP BY 1, 2
+        """
+        probe = result.probe
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(file_id), probe.route, result.engine, probe.encrypted, probe.page_count,
+                 probe.probed_pages, probe.text_pages, probe.image_pages, probe.seconds,
+                 result.seconds, result.characters, time.time())
+            )
+
+    def forget(self, pattern_ids):
+        """Drop the state of deleted patterns"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM patterns WHERE id = ?",
+                [(str(pattern_id),) for pattern_id in pattern_ids]
+            )
@@ -0,0 +1,82 @@
+"""
+Test Fixtures
+PDFWorker instances against the benchmark stand-ins, one state directory per test
+
+Run from worker/: python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# worker.py reads its configuration on import; the fixtures below point it at
+# fresh stand-ins and a fresh state directory per test
+os.environ.setdefault("DIRECTUS_TOKEN", "test-token")
+os.environ.setdefault("MEILISEARCH_KEY", "test-key")
+os.environ.setdefault("STATE_DIR", tempfile.mkdtemp(prefix="pdfworker-tests-"))
+
+from benchmark.corpus import make_pdf
+from benchmark.standins import DirectusStandIn, MeilisearchStandIn
+
+WORDS = "Maschen anschlagen und in Runden stricken, dabei jede zweite Runde abnehmen. "
+
+
+def text_pdf(pages=1, label="Anleitung"):
+    """A PDF with pages that each have plenty of text"""
+    return make_pdf([("text", f"{label} Seite {n}. " + WORDS * 4) for n in range(1, pages + 1)])
+
+
+def scan_pdf(pages):
+    """A PDF of image-only pages (a scan without a text layer)"""
+    return make_pdf([("image",)] * pages)
+
+
+def pattern(pattern_id, file_id, updated=None):
+    return {"id": pattern_id, "title": f"Pattern {pattern_id}", "slug": pattern_id,
+            "visibility": "private", "notes": "", "pdf_file": file_id,
+            "date_created": "2024-01-01T00:00:00", "date_updated": updated}
+
+
+@pytest.fixture
+def directus():
+    service = DirectusStandIn([], {}).start()
+    yield service
+    service.stop()
+
+
+@pytest.fixture
+def meilisearch():
+    service = MeilisearchStandIn(task_seconds=0).start()
+    yield service
+    service.stop()
+
+
+@pytest.fixture
+def make_worker(directus, meilisearch, tmp_path, monkeypatch):
+    """Build a PDFWorker; keyword arguments override worker.py settings"""
+    import worker
+
+    monkeypatch.setattr(worker, "DIRECTUS_URL", directus.url)
+    monkeypatch.setattr(worker, "MEILISEARCH_URL", meilisearch.url)
+    monkeypatch.setattr(worker, "STATE_DIR", str(tmp_path))
+    created = []
+
+    def make(**settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(worker, name, value)
+        pdf_worker = worker.PDFWorker()
+        created.append(pdf_worker)
+        return pdf_worker
+
+    yield make
+    for pdf_worker in created:
+        pdf_worker.extract_pool.shutdown(cancel_futures=True)
+
+
+def indexed(meilisearch):
+    """Documents in patterns_index by id"""
+    return meilisearch.indexes["patterns_index"]["documents"]
@@ -0,0 +1,31 @@
+from conftest import scan_pdf, text_pdf
+
+from extraction import extract_to_spool, probe_pdf
+from extractors import EXTRACTORS
+
+
+def test_scan_longer_than_the_probe_skips_the_engines(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "scan.pdf"
+    pdf_path.write_bytes(scan_pdf(8))
+
+    def no_engine(*args, **kwargs):
+        raise AssertionError("a scan must not run the text engines")
+
+    for extractor in EXTRACTORS.values():
+        monkeypatch.setattr(extractor, "iter_pages", no_engine)
+
+    assert probe_pdf(str(pdf_path), max_pages=3).route == "no_text"
+    result = extract_to_spool(str(pdf_path), str(tmp_path / "scan.txt"), probe_pages=3, ocr=True)
+    assert result.engine is None
+    assert result.pages == 8
+    assert result.ocr_pages == list(range(1, 9))
+
+
+def test_text_pdf_runs_the_engines(tmp_path):
+    pdf_path = tmp_path / "text.pdf"
+    pdf_path.write_bytes(text_pdf(4))
+
+    result = extract_to_spool(str(pdf_path), str(tmp_path / "text.txt"), engines=("pypdf2",))
+    assert result.probe.route == "text"
+    assert result.engine == "pypdf2"
+    assert result.pages == 4
@@ -0,0 +1,28 @@
+from conftest import indexed, pattern, scan_pdf, text_pdf
+
+
+def test_pdf_replaced_by_scan_removes_unchunked_document(directus, meilisearch, make_worker):
+    directus.files.update({"text": text_pdf(2), "scan": scan_pdf(5)})
+    directus.patterns = [pattern("p1", "text")]
+    pdf_worker = make_worker(INDEX_CHUNKING="off")
+
+    pdf_worker.process_changes()
+    assert indexed(meilisearch)["p1"]["pdf_file"] == "text"
+
+    # No text and no OCR: the new version has no documents, the old one must go
+    directus.patterns = [pattern("p1", "scan", updated="2024-02-01T00:00:00")]
+    pdf_worker.process_changes()
+    assert "p1" not in indexed(meilisearch)
+
+
+def test_pdf_replaced_by_scan_removes_chunks(directus, meilisearch, make_worker):
+    directus.files.update({"text": text_pdf(3), "scan": scan_pdf(5)})
+    directus.patterns = [pattern("p1", "text")]
+    pdf_worker = make_worker(INDEX_CHUNKING="page")
+
+    pdf_worker.process_changes()
+    assert {"p1_1", "p1_2", "p1_3"} <= set(indexed(meilisearch))
+
+    directus.patterns = [pattern("p1", "scan", updated="2024-02-01T00:00:00")]
+    pdf_worker.process_changes()
+    assert not [key for key in indexed(meilisearch) if key.startswith("p1")]
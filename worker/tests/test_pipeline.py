@@ -0,0 +1,30 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from conftest import indexed, pattern, text_pdf
+
+from extraction import extract_to_spool
+
+
+@pytest.mark.parametrize("mode", ["threads", "asyncio"])
+def test_pool_break_does_not_charge_the_jobs_in_it(directus, meilisearch, make_worker, monkeypatch,
+                                                   mode):
+    directus.files.update({"f1": text_pdf(2, "Erstes Muster"), "f2": text_pdf(2, "Zweites Muster")})
+    directus.patterns = [pattern("p1", "f1"), pattern("p2", "f2")]
+    pdf_worker = make_worker(WORKER_MODE=mode)
+
+    def submit_extraction(fn, pdf_path, spool_path, **options):
+        # Every job spools its pages, then another child dies and breaks the pool
+        extract_to_spool(pdf_path, spool_path, **options)
+        future = Future()
+        future.set_exception(BrokenProcessPool("A process in the process pool was terminated"))
+        return pdf_worker.extract_pool, future
+
+    monkeypatch.setattr(pdf_worker, "submit_extraction", submit_extraction)
+    pdf_worker.process_changes()
+
+    assert {"p1", "p2"} <= {key.split("_")[0] for key in indexed(meilisearch)}
+    assert sorted((job[0], job[2]) for job in pdf_worker.jobs.jobs()) == [("p1", 0), ("p2", 0)]
+    assert not pdf_worker.jobs.dead_letters()
@@ -0,0 +1,56 @@
+import os
+import threading
+
+from conftest import pattern, text_pdf
+
+import worker
+
+
+class LocalLeases:
+    """LeaseStore stand-in: every pattern is free (no Postgres needed)"""
+
+    def __init__(self, dsn, ttl=300, owner=None):
+        self.owner = owner or "local"
+
+    def claim(self, patterns):
+        return {str(p["id"]) for p in patterns}, set()
+
+    def finish(self, pattern):
+        pass
+
+    def release(self, pattern):
+        pass
+
+    def count(self):
+        return 0
+
+
+def test_replicas_on_one_volume_keep_separate_state(directus, make_worker, tmp_path, monkeypatch):
+    directus.files.update({f"f{n}": text_pdf(1, f"Muster {n}") for n in range(4)})
+    directus.patterns = [pattern(f"p{n}", f"f{n}") for n in range(4)]
+    monkeypatch.setattr(worker, "LeaseStore", LocalLeases)
+
+    replicas = [make_worker(LEASE_DATABASE_URL="postgresql://leases", REPLICA_NAME=name)
+                for name in ("a", "b")]
+    assert [r.state_dir for r in replicas] == [str(tmp_path / "a"), str(tmp_path / "b")]
+    assert sorted(os.listdir(tmp_path)) == ["a", "b"]
+
+    replicas[0].process_changes()
+    assert replicas[0].state.get_watermark()
+    assert not replicas[1].state.get_watermark()
+
+    # Orphan passes of both replicas at the same time must not share a scratch database
+    errors = []
+
+    def reconcile(replica):
+        try:
+            replica.reconciler.run()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reconcile, args=(r,)) for r in replicas]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
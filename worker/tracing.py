@@ -0,0 +1,218 @@
+"""
+Tracing
+Lightweight spans for single slow patterns, exported to a JSON-lines file or OTLP
+"""
+
+import contextvars
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+_exporter = None
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation with attributes; end() hands it to the exporter"""
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error = None
+        self.start = time.time_ns()
+        self.end_time = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        self.error = str(error)
+
+    def context(self):
+        """(trace id, span id), to continue the trace in another process"""
+        return self.trace_id, self.span_id
+
+    def end(self):
+        if self.end_time is None:
+            self.end_time = time.time_ns()
+            _exporter.export(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start / 1e9,
+            "duration_ms": (self.end_time - self.start) / 1e6,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Returned while tracing is off, so instrumented code costs one call"""
+
+    def set(self, **attributes):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def context(self):
+        return None
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonlExporter:
+    """Appends one JSON line per span; safe for several processes sharing the file"""
+
+    def __init__(self, path):
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        os.write(self.fd, line.encode("utf-8"))  # one write per line, so lines never interleave
+
+
+class OtlpExporter:
+    """Sends spans to an OTLP/HTTP collector (JSON encoding) from a background thread
+
+    Spans are batched for up to interval seconds; if the collector is
+    unreachable they are dropped, tracing never blocks the worker.
+    """
+
+    def __init__(self, endpoint, service_name="pdf-worker", interval=2.0, max_queue=10000):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.interval = interval
+        self.spans = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        threading.Thread(target=self._loop, name="otlp-exporter", daemon=True).start()
+
+    def export(self, span):
+        try:
+            self.spans.put_nowait(span)
+        except queue.Full:
+            pass
+
+    def _loop(self):
+        while True:
+            batch = [self.spans.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < 512 and time.monotonic() < deadline:
+                try:
+                    batch.append(self.spans.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.session.post(self.url, json=self._payload(batch), timeout=10)
+            except requests.RequestException as e:
+                print(f"⚠️ Dropped {len(batch)} spans, OTLP export failed: {e}")
+
+    def _payload(self, spans):
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "pdfworker"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,  # internal
+                    "startTimeUnixNano": str(span.start),
+                    "endTimeUnixNano": str(span.end_time),
+                    "attributes": _otlp_attributes(span.attributes),
+                    "status": {"code": 2, "message": span.error} if span.error else {},
+                } for span in spans],
+            }],
+        }]}
+
+
+def _otlp_attributes(attributes):
+    values = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            value = {"boolValue": value}
+        elif isinstance(value, int):
+            value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            value = {"doubleValue": value}
+        else:
+            value = {"stringValue": str(value)}
+        values.append({"key": key, "value": value})
+    return values
+
+
+def configure(trace_file=None, otlp_endpoint=None):
+    """Enable tracing in this process: OTLP if an endpoint is set, else the JSON-lines file
+
+    Also used as the extraction pool's initializer, so every child
+    process exports its engine spans itself.
+    """
+    global _exporter
+    if otlp_endpoint:
+        _exporter = OtlpExporter(otlp_endpoint)
+    elif trace_file:
+        _exporter = JsonlExporter(trace_file)
+    else:
+        _exporter = None
+
+
+def current_span():
+    return _current.get()
+
+
+def current_context():
+    """context() of the current span, None outside of spans"""
+    current = _current.get()
+    return current.context() if current is not None else None
+
+
+def start_span(name, parent=None, **attributes):
+    """Start a span; parent is a Span, a context() tuple or None for a new trace
+
+    The caller has to end() it. Does not change the current span.
+    """
+    if _exporter is None:
+        return NOOP_SPAN
+    if isinstance(parent, (Span, _NoopSpan)):
+        parent = parent.context()
+    trace_id, parent_id = parent if parent else (secrets.token_hex(16), None)
+    return Span(name, trace_id, parent_id, attributes)
+
+
+@contextmanager
+def span(name, parent=None, **attributes):
+    """Span around a with block, child of parent or of the current span
+
+    It is the current span inside the block; errors are recorded and re-raised.
+    """
+    if _exporter is None:
+        yield NOOP_SPAN
+        return
+    current = start_span(name, parent if parent is not None else _current.get(), **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
@@ -0,0 +1,114 @@
+"""
+Webhook Listener
+Receives Directus Flow events for patterns and queues the affected ids
+"""
+
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_BODY_BYTES = 1024 * 1024  # Directus event payloads are small; larger requests are refused
+
+
+class EventQueue:
+    """Deduplicating set of changed and deleted pattern ids"""
+
+    def __init__(self):
+        self.changed = set()
+        self.deleted = set()
+        self.condition = threading.Condition()
+
+    def put(self, changed=(), deleted=()):
+        with self.condition:
+            for key in changed:
+                self.deleted.discard(key)
+                self.changed.add(key)
+            for key in deleted:
+                self.changed.discard(key)
+                self.deleted.add(key)
+            self.condition.notify_all()
+
+    def wait(self, timeout):
+        """Block until events arrive or timeout expires; returns (changed, deleted)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.changed or self.deleted, timeout)
+            changed, deleted = self.changed, self.deleted
+            self.changed, self.deleted = set(), set()
+        return changed, deleted
+
+
+def parse_event(body):
+    """Extract (changed ids, deleted ids) from a Directus event hook payload
+
+    Directus passes the trigger as {"event": "patterns.items.update",
+    "collection": "patterns", "key": ..., "keys": [...], "payload": ...};
+    for deletions the payload itself is the list of keys.
+    """
+    event = body.get("event", "")
+    collection = body.get("collection") or event.split(".")[0]
+    if collection != "patterns":
+        return [], []
+
+    keys = body.get("keys") or ([body["key"]] if body.get("key") is not None else [])
+    if event.endswith("delete"):
+        if not keys and isinstance(body.get("payload"), list):
+            keys = body["payload"]
+        return [], [str(key) for key in keys]
+    return [str(key) for key in keys], []
+
+
+class WebhookServer:
+    """HTTP listener for Directus Flow / webhook requests (POST /webhook)"""
+
+    def __init__(self, port, events, secret=None):
+        self.events = events
+        self.secret = secret
+        self.server = ThreadingHTTPServer(("0.0.0.0", port), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, name="webhook", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    def _handler(self):
+        listener = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path.rstrip("/") != "/webhook":
+                    return self._reply(404, {"error": "not found"})
+                if listener.secret and not hmac.compare_digest(
+                    self.headers.get("X-Webhook-Secret", ""), listener.secret
+                ):
+                    return self._reply(401, {"error": "invalid secret"})
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    return self._reply(400, {"error": "invalid Content-Length"})
+                if length < 0 or length > MAX_BODY_BYTES:
+                    self.close_connection = True
+                    return self._reply(413, {"error": "request body too large"})
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return self._reply(400, {"error": "invalid JSON"})
+
+                changed, deleted = parse_event(body if isinstance(body, dict) else {})
+                listener.events.put(changed, deleted)
+                self._reply(202, {"changed": len(changed), "deleted": len(deleted)})
+
+        return Handler
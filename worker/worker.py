@@ -6,14 +6,40 @@ Extracts text from PDF patterns and indexes them in Meilisearch
 
 import os
 import sys
+import socket
+import json
 import time
-import tempfile
-import subprocess
-from pathlib import Path
+import threading
+import warnings
+import asyncio
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-import requests
 import meilisearch
-from PyPDF2 import PdfReader
+
+from async_pipeline import AsyncBatchIndexer, AsyncPipeline, async_available
+from cache import ExtractionCache
+from chunking import CHUNKING_MODES, iter_chunks
+from extraction import init_extract_process
+from extractors import EXTRACTORS
+from directus_client import DirectusClient
+from download import download_file
+from index_settings import PATTERNS_INDEX_SETTINGS, sync_settings, validate_settings
+from indexer import BatchIndexer
+from jobs import JobQueue
+from leases import LeaseStore, leases_available
+from metrics import (DIRECTUS_FETCH_SECONDS, DOWNLOAD_BYTES, DOWNLOAD_SECONDS, EXTRACT_CHILD_RSS,
+                     EXTRACT_RECYCLED, JOBS, LEASES_HELD, NORMALIZE_BYTES, MetricsServer)
+from normalize import PageNormalizer
+from ocr import CpuBudget, ocr_available
+from pipeline import Pipeline
+from reconcile import OrphanReconciler
+from sandbox import Limits
+from state import StateStore, change_stamp
+from tracing import configure as configure_tracing, start_span
+from webhook import EventQueue, WebhookServer
 
 
 # Configuration from environment variables
@@ -22,6 +48,59 @@ DIRECTUS_TOKEN = os.getenv("DIRECTUS_TOKEN")
 MEILISEARCH_URL = os.getenv("MEILISEARCH_URL", "http://meilisearch:7700")
 MEILISEARCH_KEY = os.getenv("MEILISEARCH_KEY")
 POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "60"))  # seconds
+HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "30"))  # seconds per Directus request
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "4"))
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))  # patterns per Directus request
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT") or 0)  # 0 = webhook listener disabled
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)  # 0 = /metrics endpoint disabled
+TRACE_FILE = os.getenv("TRACE_FILE")  # JSON-lines span file, unset = tracing off
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")  # OTLP/HTTP collector, wins over TRACE_FILE
+LEASE_DATABASE_URL = os.getenv("LEASE_DATABASE_URL")  # Postgres for work leases, unset = single replica
+LEASE_TTL = int(os.getenv("LEASE_TTL", "300"))  # seconds, renewed every LEASE_TTL/3
+RECONCILE_INTERVAL = int(os.getenv("RECONCILE_INTERVAL", "900"))  # seconds, webhook mode
+ORPHAN_CHECK_INTERVAL = int(os.getenv("ORPHAN_CHECK_INTERVAL", "3600"))  # seconds, 0 = off
+ORPHAN_DELETE_BATCH = int(os.getenv("ORPHAN_DELETE_BATCH", "1000"))
+STATE_DIR = os.getenv("STATE_DIR", "/app/data")
+# With leases every replica keeps its state in STATE_DIR/<REPLICA_NAME>, so
+# replicas sharing one volume never share a watermark or SQLite file
+REPLICA_NAME = os.getenv("REPLICA_NAME") or socket.gethostname()
+EXTRACT_CACHE_MAX_MB = int(os.getenv("EXTRACT_CACHE_MAX_MB", "512"))
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "256"))  # OCR pages, bounded separately
+PDF_MAX_MB = int(os.getenv("PDF_MAX_MB", "500"))
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+WORKER_MODE = os.getenv("WORKER_MODE", "threads")  # threads or asyncio
+ASYNC_DOWNLOADS = int(os.getenv("ASYNC_DOWNLOADS", "100"))  # downloads in flight, asyncio mode
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+EXTRACT_ENGINES = [  # engine chain, tried in order
+    name.strip() for name in os.getenv("EXTRACT_ENGINES", "pdftotext,pypdf2").split(",") if name.strip()
+]
+EXTRACT_TIMEOUT = int(os.getenv("EXTRACT_TIMEOUT", "30"))  # base seconds per engine run and per PDF
+EXTRACT_TIMEOUT_PER_PAGE = float(os.getenv("EXTRACT_TIMEOUT_PER_PAGE", "0.5"))  # added seconds
+EXTRACT_TIMEOUT_PER_MB = float(os.getenv("EXTRACT_TIMEOUT_PER_MB", "1"))  # added seconds
+EXTRACT_MAX_MEMORY_MB = int(os.getenv("EXTRACT_MAX_MEMORY_MB", "2048"))  # per process, 0 = unlimited
+EXTRACT_MAX_OUTPUT_MB = int(os.getenv("EXTRACT_MAX_OUTPUT_MB", "100"))  # text per PDF, 0 = unlimited
+EXTRACT_MAX_JOBS_PER_CHILD = int(os.getenv("EXTRACT_MAX_JOBS_PER_CHILD", "200"))  # 0 = never recycle
+EXTRACT_MAX_CHILD_RSS_MB = int(os.getenv("EXTRACT_MAX_CHILD_RSS_MB", "512"))  # 0 = never recycle
+EXTRACT_RANGE_PAGES = int(os.getenv("EXTRACT_RANGE_PAGES", "50"))  # split larger PDFs, 0 = never
+EXTRACT_RANGE_JOBS = int(os.getenv("EXTRACT_RANGE_JOBS", "4"))  # parallel ranges per PDF
+PROBE_PAGES = int(os.getenv("PROBE_PAGES", "3"))  # pages inspected to choose the engine
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "1"))  # concurrent OCR pages, 0 = OCR off
+OCR_CPU_BUDGET = float(os.getenv("OCR_CPU_BUDGET", "600"))  # CPU seconds for OCR per cycle
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "deu+eng")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_TIMEOUT = int(os.getenv("OCR_TIMEOUT", "120"))  # seconds per page
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "100"))
+INDEX_BATCH_MAX_MB = float(os.getenv("INDEX_BATCH_MAX_MB", "20"))
+INDEX_MAX_ATTEMPTS = int(os.getenv("INDEX_MAX_ATTEMPTS", "3"))
+INDEX_TASK_TIMEOUT = int(os.getenv("INDEX_TASK_TIMEOUT", "300"))  # seconds
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))  # failures before dead-lettering
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", "60"))  # seconds, doubled per failure
+JOB_RETRY_MAX_DELAY = int(os.getenv("JOB_RETRY_MAX_DELAY", "86400"))  # seconds
+INDEX_CHUNKING = os.getenv("INDEX_CHUNKING", "off")  # off, page or window
+CHUNK_WORDS = int(os.getenv("CHUNK_WORDS", "300"))  # words per chunk in window mode
+INDEX_NORMALIZE = os.getenv("INDEX_NORMALIZE", "on")  # on or off (see normalize.py)
 
 # Validate configuration
 if not DIRECTUS_TOKEN:
@@ -32,187 +111,594 @@ if not MEILISEARCH_KEY:
     print("❌ ERROR: MEILISEARCH_KEY not set!")
     sys.exit(1)
 
+if not EXTRACT_ENGINES or set(EXTRACT_ENGINES) - set(EXTRACTORS):
+    print(f"❌ ERROR: EXTRACT_ENGINES must be a list of {', '.join(EXTRACTORS)}!")
+    sys.exit(1)
+
+if WEBHOOK_PORT and not WEBHOOK_SECRET:
+    print("❌ ERROR: WEBHOOK_SECRET must be set when WEBHOOK_PORT is!")
+    sys.exit(1)
+
+if METRICS_PORT and METRICS_PORT == WEBHOOK_PORT:
+    print("❌ ERROR: METRICS_PORT and WEBHOOK_PORT must differ!")
+    sys.exit(1)
+
+if WORKER_MODE not in ("threads", "asyncio"):
+    print("❌ ERROR: WORKER_MODE must be threads or asyncio!")
+    sys.exit(1)
+
+if WORKER_MODE == "asyncio" and not async_available():
+    print("❌ ERROR: WORKER_MODE=asyncio requires aiohttp!")
+    sys.exit(1)
+
+if LEASE_DATABASE_URL and not leases_available():
+    print("❌ ERROR: LEASE_DATABASE_URL requires psycopg!")
+    sys.exit(1)
+
+if INDEX_CHUNKING not in CHUNKING_MODES:
+    print(f"❌ ERROR: INDEX_CHUNKING must be one of {', '.join(CHUNKING_MODES)}!")
+    sys.exit(1)
+
+if INDEX_NORMALIZE not in ("on", "off"):
+    print("❌ ERROR: INDEX_NORMALIZE must be on or off!")
+    sys.exit(1)
+
 
 class PDFWorker:
     """Worker for extracting PDF text and indexing in Meilisearch"""
     
+    PATTERN_FIELDS = ",".join([
+        "id", "title", "slug", "visibility", "notes", "date_created", "date_updated",
+        "pdf_file.id", "pdf_file.filesize", "pdf_file.modified_on", "pdf_file.uploaded_on"
+    ])
+    
     def __init__(self):
-        self.directus_headers = {
-            "Authorization": f"Bearer {DIRECTUS_TOKEN}",
-            "Content-Type": "application/json"
-        }
+        configure_tracing(TRACE_FILE, OTLP_ENDPOINT)
+        self.directus = DirectusClient(
+            DIRECTUS_URL,
+            DIRECTUS_TOKEN,
+            timeout=HTTP_TIMEOUT,
+            retries=HTTP_RETRIES,
+            pool_size=DOWNLOAD_WORKERS + 2
+        )
         self.meili_client = meilisearch.Client(MEILISEARCH_URL, MEILISEARCH_KEY)
+        self.state_dir = os.path.join(STATE_DIR, REPLICA_NAME) if LEASE_DATABASE_URL else STATE_DIR
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.state = StateStore(os.path.join(self.state_dir, "worker_state.db"))
+        layout = f"chunking={INDEX_CHUNKING}:{CHUNK_WORDS}"
+        if INDEX_NORMALIZE == "on":
+            layout += ",normalize"
+        if self.state.reset_on_change(layout):
+            print(f"🔁 Index layout changed (chunking '{INDEX_CHUNKING}', normalization "
+                  f"{INDEX_NORMALIZE}), re-indexing all patterns")
+        self.cache = ExtractionCache(
+            os.path.join(self.state_dir, "extract_cache.db"),
+            EXTRACT_CACHE_MAX_MB * 1024 * 1024,
+            OCR_CACHE_MAX_MB * 1024 * 1024
+        )
+        self.ocr_workers = OCR_WORKERS
+        if self.ocr_workers and not ocr_available():
+            print("⚠️ pdftoppm/tesseract not found, OCR disabled")
+            self.ocr_workers = 0
+        # One budget per sweep, not per pipeline run: webhook batches in between share it
+        self.ocr_budget = CpuBudget(OCR_CPU_BUDGET)
+        self.ocr_options = {
+            "languages": OCR_LANGUAGES,
+            "dpi": OCR_DPI,
+            "timeout": OCR_TIMEOUT
+        }
+        self.extract_options = {
+            "engines": tuple(EXTRACT_ENGINES),
+            "range_pages": EXTRACT_RANGE_PAGES,
+            "range_jobs": EXTRACT_RANGE_JOBS,
+            "timeout": EXTRACT_TIMEOUT,
+            "probe_pages": PROBE_PAGES,
+            "ocr": bool(self.ocr_workers),
+            "limits": Limits(
+                EXTRACT_MAX_MEMORY_MB, EXTRACT_MAX_OUTPUT_MB,
+                EXTRACT_TIMEOUT_PER_PAGE, EXTRACT_TIMEOUT_PER_MB
+            )
+        }
+        self.jobs = JobQueue(
+            os.path.join(self.state_dir, "jobs.db"),
+            max_attempts=JOB_MAX_ATTEMPTS,
+            base_delay=JOB_RETRY_DELAY,
+            max_delay=JOB_RETRY_MAX_DELAY
+        )
+        JOBS.set(lambda: self.jobs.count("jobs"), state="waiting")
+        JOBS.set(lambda: self.jobs.count("dead_letters"), state="dead")
+        self.leases = LeaseStore(LEASE_DATABASE_URL, LEASE_TTL) if LEASE_DATABASE_URL else None
+        if self.leases:
+            LEASES_HELD.set(self.leases.count)
+        self.extract_pool_lock = threading.Lock()
+        self.extract_pool = self.create_extract_pool()
+        self.extract_children = {}  # pid -> jobs run, for the current pool
         self.setup_meilisearch_index()
+        self.events = EventQueue() if WEBHOOK_PORT else None
+        self.reconciler = OrphanReconciler(
+            self,
+            os.path.join(self.state_dir, "reconcile.db"),
+            page_size=max(PAGE_SIZE, 1000),
+            delete_batch_size=ORPHAN_DELETE_BATCH
+        )
+    
+    @staticmethod
+    def create_extract_pool():
+        """Process pool for CPU-bound text extraction, sandboxed (see sandbox.py)"""
+        # forkserver: never fork the threaded main process
+        return ProcessPoolExecutor(
+            max_workers=EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=init_extract_process,  # children export their engine spans themselves
+            initargs=(TRACE_FILE, OTLP_ENDPOINT, EXTRACT_MAX_MEMORY_MB),
+            max_tasks_per_child=EXTRACT_MAX_JOBS_PER_CHILD or None
+        )
+    
+    def available_engines(self):
+        """Configured engines that are installed, in chain order"""
+        return [name for name in self.extract_options["engines"] if EXTRACTORS[name].available()]
+    
+    def submit_extraction(self, fn, *args, **kwargs):
+        """Submit a job to the current extraction pool; returns (pool, future)
+        
+        Under the pool lock, so the pool cannot be swapped out in between.
+        """
+        with self.extract_pool_lock:
+            try:
+                return self.extract_pool, self.extract_pool.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                print("⚠️ Extraction process pool broke, restarting it")
+                self._replace_extract_pool(cancel_futures=True)
+                return self.extract_pool, self.extract_pool.submit(fn, *args, **kwargs)
+    
+    def reset_extract_pool(self, broken_pool):
+        """Replace a broken extraction pool (once, even if several threads noticed)"""
+        with self.extract_pool_lock:
+            if self.extract_pool is broken_pool:
+                print("⚠️ Extraction process pool broke, restarting it")
+                self._replace_extract_pool(cancel_futures=True)
+    
+    def extraction_finished(self, pool, result):
+        """Track the memory and job count of the child that ran an extraction
+        
+        Long-running children fragment their heap (PdfReader objects, large
+        strings), so they are recycled: the pool itself replaces a child
+        after EXTRACT_MAX_JOBS_PER_CHILD jobs, and once a child's RSS is
+        over EXTRACT_MAX_CHILD_RSS_MB the whole pool is swapped for a fresh
+        one. Jobs already running finish in the old pool.
+        """
+        with self.extract_pool_lock:
+            if pool is not self.extract_pool:
+                return
+            jobs = self.extract_children.get(result.pid, 0) + 1
+            if EXTRACT_MAX_JOBS_PER_CHILD and jobs >= EXTRACT_MAX_JOBS_PER_CHILD:
+                self.extract_children.pop(result.pid, None)
+                EXTRACT_CHILD_RSS.remove(pid=result.pid)
+                EXTRACT_RECYCLED.inc(reason="jobs")
+            elif EXTRACT_MAX_CHILD_RSS_MB and result.rss > EXTRACT_MAX_CHILD_RSS_MB * 1024 * 1024:
+                print(f"♻️ Extraction process {result.pid} uses {result.rss // 1024 // 1024} MB, "
+                      f"recycling the pool")
+                EXTRACT_RECYCLED.inc(len(self.extract_children) + 1, reason="rss")
+                self._replace_extract_pool(cancel_futures=False)
+            else:
+                self.extract_children[result.pid] = jobs
+                EXTRACT_CHILD_RSS.set(result.rss, pid=result.pid)
+    
+    def _replace_extract_pool(self, cancel_futures):
+        """Shut the current pool down and start a new one (extract_pool_lock held)"""
+        for pid in self.extract_children:
+            EXTRACT_CHILD_RSS.remove(pid=pid)
+        self.extract_children = {}
+        self.extract_pool.shutdown(wait=False, cancel_futures=cancel_futures)
+        self.extract_pool = self.create_extract_pool()
     
     def setup_meilisearch_index(self):
-        """Create and configure Meilisearch index for patterns"""
+        """Create patterns_index if needed and bring its settings up to date"""
         try:
             # Create index if it doesn't exist
             try:
                 self.patterns_index = self.meili_client.get_index("patterns_index")
                 print("✅ Connected to existing patterns_index")
             except meilisearch.errors.MeilisearchApiError:
-                self.meili_client.create_index("patterns_index", {"primaryKey": "id"})
+                task = self.meili_client.create_index("patterns_index", {"primaryKey": "id"})
+                self.meili_client.wait_for_task(task.task_uid,
+                                                timeout_in_ms=INDEX_TASK_TIMEOUT * 1000)
                 self.patterns_index = self.meili_client.get_index("patterns_index")
                 print("✅ Created patterns_index")
             
-            # Configure searchable attributes
-            self.patterns_index.update_searchable_attributes([
-                "title",
-                "notes",
-                "tags",
-                "pdf_text"
-            ])
-            
-            # Configure filterable attributes
-            self.patterns_index.update_filterable_attributes([
-                "visibility",
-                "date_created"
-            ])
+            # Check the settings against what build_documents() really writes
+            sample = {"id": "sample", "title": "", "pdf_file": "sample"}
+            document = next(self.build_documents(sample, iter([(1, "sample text")])))
+            validate_settings(PATTERNS_INDEX_SETTINGS, document)
             
+            sync_settings(self.meili_client, self.patterns_index, PATTERNS_INDEX_SETTINGS,
+                          timeout_in_ms=INDEX_TASK_TIMEOUT * 1000)
             print("✅ Meilisearch index configured")
         except Exception as e:
             print(f"❌ Error setting up Meilisearch: {e}")
             raise
     
-    def get_patterns_to_process(self):
-        """Fetch patterns from Directus that need PDF processing"""
-        try:
-            url = f"{DIRECTUS_URL}/items/patterns"
+    def iter_patterns(self, filters, fields=None, trace=None):
+        """Yield all patterns matching filters, one Directus page at a time
+        
+        Keyset pagination on id (sort=id, id > last seen id, limit=PAGE_SIZE),
+        so only one page is held in memory. Errors propagate. Each request
+        is traced as a child of trace, if given.
+        """
+        last_id = None
+        while True:
+            page_filters = filters + ([{"id": {"_gt": last_id}}] if last_id is not None else [])
             params = {
-                "fields": "id,title,slug,visibility,notes,pdf_file,date_created,date_updated",
-                "filter[pdf_file][_nnull]": "true"  # Has a PDF file
+                "fields": fields or self.PATTERN_FIELDS,
+                "filter": json.dumps({"_and": page_filters}),
+                "sort": "id",
+                "limit": PAGE_SIZE
             }
             
-            response = requests.get(url, headers=self.directus_headers, params=params)
+            fetch = start_span("directus_fetch", trace, after=last_id or "")
+            with DIRECTUS_FETCH_SECONDS.time():
+                response = self.directus.get("/items/patterns", params=params)
+            fetch.set(status=response.status_code)
+            fetch.end()
             response.raise_for_status()
+            page = response.json().get("data", [])
+            yield from page
             
-            patterns = response.json().get("data", [])
-            print(f"📄 Found {len(patterns)} patterns with PDFs")
-            return patterns
-        except Exception as e:
-            print(f"❌ Error fetching patterns: {e}")
-            return []
+            if len(page) < PAGE_SIZE:
+                return
+            last_id = page[-1]["id"]
     
-    def download_pdf(self, file_id):
-        """Download PDF file from Directus"""
+    def get_patterns_to_process(self):
+        """Yield patterns from Directus that are new or changed since the last run
+        
+        Errors propagate: a partial listing must not advance the watermark.
+        """
+        filters = [{"pdf_file": {"_nnull": True}}]  # Has a PDF file
+        
+        # Only ask for patterns touched since the watermark (_gte, so items
+        # sharing the watermark's timestamp are not lost; they are deduped below)
+        watermark = self.state.get_watermark()
+        if watermark:
+            filters.append({"_or": [
+                {"date_updated": {"_gte": watermark}},
+                {"date_created": {"_gte": watermark}}
+            ]})
+        
+        found = 0
+        # Ends once the listing is exhausted, so it includes waiting on the
+        # pipeline; the directus_fetch child spans show the request time
+        trace = start_span("get_patterns_to_process", watermark=watermark or "")
         try:
-            url = f"{DIRECTUS_URL}/assets/{file_id}"
-            response = requests.get(url, headers=self.directus_headers)
-            response.raise_for_status()
-            
-            # Save to temporary file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-            temp_file.write(response.content)
-            temp_file.close()
-            
-            return temp_file.name
+            for pattern in map(self.flatten_pdf_file, self.iter_patterns(filters, trace=trace)):
+                if self.state.needs_processing(pattern):
+                    found += 1
+                    yield pattern
         except Exception as e:
-            print(f"❌ Error downloading PDF {file_id}: {e}")
-            return None
+            trace.fail(e)
+            raise
+        finally:
+            trace.set(found=found)
+            trace.end()
+        
+        print(f"📄 Found {found} new or changed patterns with PDFs")
     
-    def extract_text_pypdf2(self, pdf_path):
-        """Extract text from PDF using PyPDF2"""
-        try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
-        except Exception as e:
-            print(f"⚠️ PyPDF2 extraction failed: {e}")
-            return None
+    def get_patterns_by_id(self, pattern_ids):
+        """Fetch specific patterns (e.g. from webhook events), PAGE_SIZE ids per request"""
+        pattern_ids = list(pattern_ids)
+        for start in range(0, len(pattern_ids), PAGE_SIZE):
+            params = {
+                "fields": self.PATTERN_FIELDS,
+                "filter": json.dumps({"id": {"_in": pattern_ids[start:start + PAGE_SIZE]}}),
+                "limit": PAGE_SIZE
+            }
+            with DIRECTUS_FETCH_SECONDS.time():
+                response = self.directus.get("/items/patterns", params=params)
+            response.raise_for_status()
+            yield from map(self.flatten_pdf_file, response.json().get("data", []))
     
-    def extract_text_pdftotext(self, pdf_path):
-        """Extract text from PDF using pdftotext (poppler)"""
+    @staticmethod
+    def flatten_pdf_file(pattern):
+        """Replace the expanded pdf_file relation by its id and keep a version string
+        
+        The version changes whenever the file is replaced in Directus and is
+        used to look up extracted text without downloading the PDF again.
+        """
+        pdf_file = pattern.get("pdf_file")
+        if isinstance(pdf_file, dict):
+            modified = pdf_file.get("modified_on") or pdf_file.get("uploaded_on") or ""
+            pattern["pdf_file"] = pdf_file.get("id")
+            pattern["pdf_version"] = f"{modified}:{pdf_file.get('filesize', '')}"
+        return pattern
+    
+    def download_pdf(self, file_id, etag=None):
+        """Stream PDF file from Directus to a temporary file
+        
+        Returns a DownloadResult (status "not_modified" if etag still matches,
+        "too_large" above PDF_MAX_MB) or None on errors.
+        """
+        start = time.monotonic()
         try:
-            result = subprocess.run(
-                ["pdftotext", pdf_path, "-"],
-                capture_output=True,
-                text=True,
-                timeout=30
+            result = download_file(
+                self.directus, f"/assets/{file_id}", PDF_MAX_MB * 1024 * 1024, etag
             )
-            if result.returncode == 0:
-                return result.stdout.strip()
-            return None
+            DOWNLOAD_SECONDS.observe(time.monotonic() - start, status=result.status)
+            if result.status == "ok":
+                DOWNLOAD_BYTES.inc(result.size)
+            if result.status == "too_large":
+                print(f"⚠️ PDF {file_id} exceeds {PDF_MAX_MB} MB, skipping")
+            return result
         except Exception as e:
-            print(f"⚠️ pdftotext extraction failed: {e}")
+            DOWNLOAD_SECONDS.observe(time.monotonic() - start, status="error")
+            print(f"❌ Error downloading PDF {file_id}: {e}")
             return None
     
-    def extract_pdf_text(self, pdf_path):
-        """Extract text from PDF using multiple methods"""
-        # Try pdftotext first (usually better)
-        text = self.extract_text_pdftotext(pdf_path)
+    def build_documents(self, pattern, pages):
+        """Yield the Meilisearch documents for a pattern from its (page number, text) pairs
+        
+        Without chunking this is one document with the pattern id (the only
+        case that needs the whole text at once). With INDEX_CHUNKING=page/window
+        every chunk becomes its own document ("<id>_<n>") carrying
+        pattern_id and the page it starts on, built while pages stream in.
+        With INDEX_NORMALIZE=on the pages are normalized first (headers,
+        footers, hyphenation, whitespace) and the bytes saved are reported.
+        """
+        base = {
+            "pattern_id": str(pattern["id"]),
+            "title": pattern["title"],
+            "slug": pattern.get("slug", ""),
+            "visibility": pattern.get("visibility", "private"),
+            "notes": pattern.get("notes", ""),
+            "pdf_file": pattern.get("pdf_file", ""),
+            "date_created": pattern.get("date_created", ""),
+            "date_updated": pattern.get("date_updated", ""),
+        }
+        normalizer = PageNormalizer() if INDEX_NORMALIZE == "on" else None
+        if normalizer:
+            pages = normalizer.normalize(pages)
         
-        # Fallback to PyPDF2
-        if not text or len(text) < 50:
-            text = self.extract_text_pypdf2(pdf_path)
+        if INDEX_CHUNKING == "off":
+            pdf_text = "\f".join(text for _, text in pages).rstrip()
+            if pdf_text.strip():
+                yield {**base, "id": pattern["id"], "chunk": 0, "page": None, "content": pdf_text}
+        else:
+            chunks = iter_chunks(pages, INDEX_CHUNKING, CHUNK_WORDS)
+            for n, (page, text) in enumerate(chunks, 1):
+                yield {**base, "id": f"{pattern['id']}_{n}", "chunk": n, "page": page, "content": text}
         
-        return text or ""
+        if normalizer and normalizer.bytes_in:
+            print(f"  Normalization saved {normalizer.bytes_saved} of {normalizer.bytes_in} bytes "
+                  f"({normalizer.bytes_saved / normalizer.bytes_in:.0%})")
+            NORMALIZE_BYTES.inc(normalizer.bytes_in, stage="raw")
+            NORMALIZE_BYTES.inc(normalizer.bytes_out, stage="normalized")
     
-    def index_pattern(self, pattern, pdf_text):
-        """Index pattern in Meilisearch"""
-        try:
-            document = {
-                "id": pattern["id"],
-                "title": pattern["title"],
-                "slug": pattern.get("slug", ""),
-                "visibility": pattern.get("visibility", "private"),
-                "notes": pattern.get("notes", ""),
-                "pdf_file": pattern.get("pdf_file", ""),
-                "content": pdf_text,
-                "date_created": pattern.get("date_created", ""),
-                "date_updated": pattern.get("date_updated", ""),
-            }
-            
-            self.patterns_index.add_documents([document])
-            print(f"✅ Indexed pattern: {pattern['title']}")
-        except Exception as e:
-            print(f"❌ Error indexing pattern {pattern['id']}: {e}")
+    @staticmethod
+    def stale_documents_filter(pattern, count):
+        """Filter for documents of a pattern that its count new documents do not overwrite
+        
+        Covers chunks beyond the new chunk count and documents left over
+        from a different INDEX_CHUNKING mode. Without any new documents (no
+        text, e.g. a scan replaced the PDF) every document of the pattern goes.
+        """
+        pattern_id = json.dumps(str(pattern["id"]))
+        if count == 0:
+            return f"id = {pattern_id} OR pattern_id = {pattern_id}"
+        if INDEX_CHUNKING == "off":
+            return f"pattern_id = {pattern_id} AND chunk != 0"
+        return (f"id = {pattern_id} OR "
+                f"(pattern_id = {pattern_id} AND (chunk = 0 OR chunk > {count}))")
     
-    def process_pattern(self, pattern):
-        """Process a single pattern: download PDF, extract text, index"""
-        if not pattern.get("pdf_file"):
+    def with_retries(self, patterns):
+        """Patterns not waiting in the job queue, followed by the retries that are due
+        
+        Failed patterns are retried from the job queue rather than by
+        holding back the watermark, so the due ones are fetched by id.
+        """
+        listed = set()
+        for pattern in patterns:
+            listed.add(str(pattern["id"]))
+            if not self.jobs.blocked(pattern):
+                yield pattern
+        
+        due = [pattern_id for pattern_id in self.jobs.due() if pattern_id not in listed]
+        if not due:
+            return
+        print(f"🔁 Retrying {len(due)} patterns from the job queue")
+        found = set()
+        for pattern in self.get_patterns_by_id(due):
+            if pattern.get("pdf_file") and self.state.needs_processing(pattern):
+                found.add(str(pattern["id"]))
+                yield pattern
+        # Deleted, lost their PDF or indexed by a peer in the meantime
+        self.jobs.forget(set(due) - found)
+    
+    def claim_patterns(self, patterns, busy):
+        """Keep the patterns this replica got a lease for (all of them without leases)
+        
+        Claims PAGE_SIZE patterns per query as the iterator advances.
+        Patterns a peer is working on are appended to busy; those a peer
+        already indexed in their current version are only marked processed.
+        """
+        if self.leases is None:
+            yield from patterns
             return
+        patterns = iter(patterns)
+        while chunk := list(islice(patterns, PAGE_SIZE)):
+            claimed, done = self.leases.claim(chunk)
+            for pattern in chunk:
+                if str(pattern["id"]) in claimed:
+                    yield pattern
+                elif str(pattern["id"]) in done:
+                    self.state.mark_processed(pattern)
+                else:
+                    busy.append(pattern)
+    
+    def create_indexer(self, on_indexed, on_failed, session=None):
+        """Batching indexer for patterns_index (over aiohttp if a session is given)"""
+        options = dict(
+            max_documents=INDEX_BATCH_SIZE,
+            max_bytes=int(INDEX_BATCH_MAX_MB * 1024 * 1024),
+            max_attempts=INDEX_MAX_ATTEMPTS,
+            task_timeout=INDEX_TASK_TIMEOUT,
+            on_indexed=on_indexed,
+            on_failed=on_failed
+        )
+        if session is not None:
+            return AsyncBatchIndexer(session, MEILISEARCH_URL, MEILISEARCH_KEY,
+                                     "patterns_index", **options)
+        return BatchIndexer(self.meili_client, self.patterns_index, **options)
+    
+    def process_patterns(self, patterns):
+        """Run patterns through the download/extract/index pipeline
+        
+        Returns the patterns that failed and have to be retried.
+        """
+        if WORKER_MODE == "asyncio":
+            pipeline = AsyncPipeline(
+                self,
+                downloads=ASYNC_DOWNLOADS,
+                extract_workers=EXTRACT_WORKERS,
+                queue_size=PIPELINE_QUEUE_SIZE,
+                max_pdf_bytes=PDF_MAX_MB * 1024 * 1024,
+                ocr_workers=self.ocr_workers,
+                ocr_budget=self.ocr_budget
+            )
+            return asyncio.run(pipeline.run(patterns))
+        
+        pipeline = Pipeline(
+            self,
+            download_workers=DOWNLOAD_WORKERS,
+            extract_workers=EXTRACT_WORKERS,
+            queue_size=PIPELINE_QUEUE_SIZE,
+            ocr_workers=self.ocr_workers,
+            ocr_budget=self.ocr_budget
+        )
+        return pipeline.run(patterns)
+    
+    def process_changes(self):
+        """One polling cycle: process new or changed patterns, then advance the watermark"""
+        newest = ""
         
-        print(f"\n📖 Processing: {pattern['title']}")
+        def track_newest(patterns):
+            nonlocal newest
+            for pattern in patterns:
+                newest = max(newest, change_stamp(pattern))
+                yield pattern
         
-        # Download PDF
-        pdf_path = self.download_pdf(pattern["pdf_file"])
-        if not pdf_path:
+        self.ocr_budget.reset()
+        busy = []
+        patterns = self.with_retries(track_newest(self.get_patterns_to_process()))
+        failed = self.process_patterns(self.claim_patterns(patterns, busy))
+        if failed:
+            print(f"⚠️ {len(failed)} patterns failed, queued for retry")
+        
+        # Failed patterns are in the job queue; only patterns a peer is working
+        # on hold the watermark back (it may crash and leave them to us)
+        if busy:
+            self.state.set_watermark(min(change_stamp(p) for p in busy))
+        else:
+            self.state.set_watermark(newest)
+    
+    def delete_patterns(self, pattern_ids):
+        """Remove patterns (all their documents) from patterns_index and forget their state"""
+        pattern_ids = [str(pattern_id) for pattern_id in pattern_ids]
+        if not pattern_ids:
             return
+        # Unchunked documents use the pattern id, chunks are found by pattern_id
+        self.delete_documents(pattern_ids)
+        task = self.patterns_index.delete_documents(
+            filter=f"pattern_id IN {json.dumps(pattern_ids)}"
+        )
+        self.meili_client.wait_for_task(task.task_uid, timeout_in_ms=INDEX_TASK_TIMEOUT * 1000)
+        self.state.forget(pattern_ids)
+        self.jobs.forget(pattern_ids)
+        print(f"🗑️ Removed {len(pattern_ids)} patterns from index")
+    
+    def delete_documents(self, document_ids):
+        """Remove documents from patterns_index by document id and wait for the task"""
+        # The SDK flags id lists as deprecated; the delete-batch route itself is fine
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            task = self.patterns_index.delete_documents(list(document_ids))
+        self.meili_client.wait_for_task(task.task_uid, timeout_in_ms=INDEX_TASK_TIMEOUT * 1000)
+    
+    def process_events(self, changed, deleted):
+        """Handle pattern ids reported by Directus webhooks"""
+        print(f"\n🔔 Webhook: {len(changed)} changed, {len(deleted)} deleted")
         
-        try:
-            # Extract text
-            print("  Extracting text...")
-            pdf_text = self.extract_pdf_text(pdf_path)
-            
-            if pdf_text:
-                print(f"  Extracted {len(pdf_text)} characters")
-                # Index in Meilisearch
-                self.index_pattern(pattern, pdf_text)
-            else:
-                print("  ⚠️ No text extracted from PDF")
-        finally:
-            # Clean up temporary file
-            Path(pdf_path).unlink(missing_ok=True)
+        # Directus has the last word: a delete event only removes patterns that
+        # are really gone (the request could be forged or arrive out of order),
+        # and changed items that vanished or lost their PDF are deletions too
+        reported = set(changed) | set(deleted)
+        patterns = [
+            pattern for pattern in self.get_patterns_by_id(reported)
+            if pattern.get("pdf_file")
+        ]
+        self.delete_patterns(reported - {str(p["id"]) for p in patterns})
+        
+        # Patterns leased by a peer are left to it; the next sweep checks on them
+        failed = self.process_patterns(self.claim_patterns(
+            (p for p in patterns if self.state.needs_processing(p) and not self.jobs.blocked(p)), []
+        ))
+        if failed:
+            print(f"⚠️ {len(failed)} patterns failed, queued for retry")
     
     def run(self):
-        """Main worker loop"""
+        """Main worker loop
+        
+        Without webhooks: a full change sweep every POLL_INTERVAL seconds.
+        With WEBHOOK_PORT set: handle events as they arrive and only sweep
+        every RECONCILE_INTERVAL seconds to catch missed events.
+        """
         print("🚀 PDF Worker started")
         print(f"   Directus: {DIRECTUS_URL}")
         print(f"   Meilisearch: {MEILISEARCH_URL}")
-        print(f"   Poll interval: {POLL_INTERVAL}s\n")
+        if self.events:
+            WebhookServer(WEBHOOK_PORT, self.events, WEBHOOK_SECRET).start()
+            print(f"   Webhook listener: port {WEBHOOK_PORT}")
+            print(f"   Reconcile interval: {RECONCILE_INTERVAL}s")
+        else:
+            print(f"   Poll interval: {POLL_INTERVAL}s")
+        if METRICS_PORT:
+            MetricsServer(METRICS_PORT).start()
+            print(f"   Metrics: http://0.0.0.0:{METRICS_PORT}/metrics")
+        if OTLP_ENDPOINT or TRACE_FILE:
+            print(f"   Tracing: {OTLP_ENDPOINT or TRACE_FILE}")
+        if self.leases:
+            print(f"   Leases: {self.leases.owner} ({LEASE_TTL}s TTL), state in {self.state_dir}")
+        if WORKER_MODE == "asyncio":
+            print(f"   Pipeline: asyncio, {ASYNC_DOWNLOADS} downloads, {EXTRACT_WORKERS} extractors")
+        else:
+            print(f"   Pipeline: {DOWNLOAD_WORKERS} downloads, {EXTRACT_WORKERS} extractors")
+        print(f"   Extraction engines: {' -> '.join(self.available_engines())}")
+        if self.ocr_workers:
+            print(f"   OCR: {self.ocr_workers} workers, {OCR_CPU_BUDGET:.0f} CPU seconds per cycle")
+        print(f"   Chunking: {INDEX_CHUNKING}\n")
         
+        interval = RECONCILE_INTERVAL if self.events else POLL_INTERVAL
+        next_sweep = 0
+        next_orphan_check = 0
         while True:
             try:
-                patterns = self.get_patterns_to_process()
+                if ORPHAN_CHECK_INTERVAL and time.monotonic() >= next_orphan_check:
+                    self.reconciler.run()
+                    next_orphan_check = time.monotonic() + ORPHAN_CHECK_INTERVAL
                 
-                for pattern in patterns:
-                    self.process_pattern(pattern)
+                if time.monotonic() >= next_sweep:
+                    self.process_changes()
+                    next_sweep = time.monotonic() + interval
+                    print(f"\n💤 Next sweep in {interval}s...")
                 
-                print(f"\n💤 Sleeping for {POLL_INTERVAL}s...")
-                time.sleep(POLL_INTERVAL)
+                remaining = max(0, next_sweep - time.monotonic())
+                if self.events:
+                    changed, deleted = self.events.wait(timeout=remaining)
+                    if changed or deleted:
+                        try:
+                            self.process_events(changed, deleted)
+                        except Exception:
+                            self.events.put(changed, deleted)  # retry after the pause below
+                            raise
+                else:
+                    time.sleep(remaining)
                 
             except KeyboardInterrupt:
                 print("\n👋 Worker stopped by user")